@@ -0,0 +1,88 @@
+from extensions import db
+from models import Admin, Volunteer, Account
+from sqlalchemy import event, inspect, exists, select, literal, func, or_, and_
+from sqlalchemy.orm import Session
+
+ACCOUNT_ROLES = {
+    Admin: 'admin',
+    Volunteer: 'volunteer'
+}
+
+
+def find_account(email):
+    return Account.query.filter_by(email=email).first()
+
+
+def principal_for(account):
+    model = Admin if account.role == 'admin' else Volunteer
+    return model.query.get(account.uid)
+
+
+def upgrade_password_hash(account, password):
+    # Re-hash with the configured method after a successful login; the flush
+    # hook below copies the new hash into accounts
+    principal = principal_for(account)
+    if principal:
+        principal.set_password(password)
+        db.session.commit()
+
+
+def _changed(obj, attr):
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_accounts(session, flush_context):
+    # Mirror admin/volunteer credentials into accounts within the same
+    # transaction; the unique index on accounts.email rejects an email that is
+    # already used by either table.
+    table = Account.__table__
+    connection = session.connection()
+    for obj in session.new:
+        role = ACCOUNT_ROLES.get(type(obj))
+        if role:
+            connection.execute(table.insert().values(
+                uid=obj.uid, email=obj.email, role=role, password_hash=obj.password_hash
+            ))
+    # Matched on role as well as uid, so a write can only touch the row that
+    # belongs to the same kind of principal
+    for obj in session.dirty:
+        role = ACCOUNT_ROLES.get(type(obj))
+        if role and (_changed(obj, 'email') or _changed(obj, 'password_hash')):
+            connection.execute(table.update().where(table.c.uid == obj.uid, table.c.role == role).values(
+                email=obj.email, password_hash=obj.password_hash
+            ))
+    for obj in session.deleted:
+        role = ACCOUNT_ROLES.get(type(obj))
+        if role:
+            connection.execute(table.delete().where(table.c.uid == obj.uid, table.c.role == role))
+
+
+def backfill_accounts():
+    # Rows already mirrored are left alone, so the backfill can be re-run.
+    # A uid or email shared by two principals cannot be resolved safely, so
+    # it stops the migration instead of being skipped. Returns the number of
+    # rows added.
+    table = Account.__table__
+    added = 0
+    for model, role in ACCOUNT_ROLES.items():
+        source = model.__table__
+        mirrored = exists().where(and_(table.c.uid == source.c.uid, table.c.role == role))
+        taken = exists().where(or_(table.c.email == source.c.email, table.c.uid == source.c.uid))
+        collisions = db.session.execute(
+            select(source.c.uid, source.c.email).where(~mirrored, taken)
+        ).all()
+        if collisions:
+            db.session.rollback()
+            listed = ', '.join(f'{row.uid} <{row.email}>' for row in collisions[:20])
+            raise RuntimeError(
+                f'{len(collisions)} {model.__tablename__} rows share a uid or email with another '
+                f'account and must be fixed by hand: {listed}'
+            )
+        added += db.session.execute(select(func.count()).select_from(source).where(~mirrored)).scalar()
+        db.session.execute(table.insert().from_select(
+            ['uid', 'email', 'role', 'password_hash'],
+            select(source.c.uid, source.c.email, literal(role), source.c.password_hash).where(~mirrored)
+        ))
+    db.session.commit()
+    return added
@@ -1,27 +1,84 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
-from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from extensions import db, jwt, cors
+from engine_profiles import apply_engine_profile
+import replicas
+from datetime import timedelta
+import json
 import os
 
-# Initialize Flask app
-app = Flask(__name__)
+def default_config():
+    config = {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'dev-secret-key'),
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('DATABASE_URL', 'sqlite:///app.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key'),
+        # Key ring as a JSON object of key id -> secret; JWT_SIGNING_KEY_ID
+        # (default: the first entry) signs, and every entry verifies
+        'JWT_SIGNING_KEYS': json.loads(os.environ.get('JWT_SIGNING_KEYS') or '{}'),
+        'JWT_SIGNING_KEY_ID': os.environ.get('JWT_SIGNING_KEY_ID'),
+        'JWT_ACCESS_TOKEN_EXPIRES': timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15))),
+        'JWT_REFRESH_TOKEN_EXPIRES': timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', 30))),
+        'PAGE_SIZE_DEFAULT': int(os.environ.get('PAGE_SIZE_DEFAULT', 50)),
+        'PAGE_SIZE_MAX': int(os.environ.get('PAGE_SIZE_MAX', 500)),
+        'PASSWORD_HASH_METHOD': os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000'),
+        'PASSWORD_HASH_WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)),
+        'BULK_MAX_ITEMS': int(os.environ.get('BULK_MAX_ITEMS', 5000)),
+        'PASSWORD_HASH_EXECUTOR': os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread'),
+        'JSON_BACKEND': os.environ.get('JSON_BACKEND', 'auto'),
+        'COMPRESS_MIN_SIZE': int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+        'COMPRESS_GZIP_LEVEL': int(os.environ.get('COMPRESS_GZIP_LEVEL', 6)),
+        'COMPRESS_BR_LEVEL': int(os.environ.get('COMPRESS_BR_LEVEL', 5)),
+        'DB_PROFILE': os.environ.get('DB_PROFILE', 'dev'),
+        'REPLICA_PIN_SECONDS': int(os.environ.get('REPLICA_PIN_SECONDS', 5)),
+        'IDENTITY_CACHE_SIZE': int(os.environ.get('IDENTITY_CACHE_SIZE', 10000)),
+        'IDENTITY_CACHE_TTL': float(os.environ.get('IDENTITY_CACHE_TTL', 30)),
+        'REVOCATION_SYNC_SECONDS': float(os.environ.get('REVOCATION_SYNC_SECONDS', 1)),
+        'REVOCATION_PRUNE_SECONDS': float(os.environ.get('REVOCATION_PRUNE_SECONDS', 300)),
+        'REVOCATION_FILTER_CAPACITY': int(os.environ.get('REVOCATION_FILTER_CAPACITY', 100000)),
+        'REVOCATION_FILTER_ERROR_RATE': float(os.environ.get('REVOCATION_FILTER_ERROR_RATE', 0.001)),
+        'RATELIMIT_ENABLED': os.environ.get('RATELIMIT_ENABLED', '1') not in ('0', 'false', 'False'),
+        'RATELIMIT_BACKEND': os.environ.get('RATELIMIT_BACKEND', 'memory'),
+        'RATELIMIT_MAX_KEYS': int(os.environ.get('RATELIMIT_MAX_KEYS', 100000)),
+        # Number of reverse proxies in front of the app whose X-Forwarded-For
+        # is trusted for the client IP (rate limits are keyed on it). 0 uses
+        # the socket peer, which behind a proxy is the proxy for every client.
+        'RATELIMIT_TRUSTED_PROXIES': int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0)),
+        # JSON object of endpoint -> rules, overriding ratelimit.DEFAULT_RATE_LIMITS
+        'RATE_LIMITS': json.loads(os.environ.get('RATE_LIMITS') or '{}')
+    }
+    # Optional read replica: read-only requests are served from it
+    if os.environ.get('REPLICA_DATABASE_URL'):
+        config['SQLALCHEMY_BINDS'] = {'replica': os.environ['REPLICA_DATABASE_URL']}
+    return config
 
-# Configure CORS to be more permissive for development
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}})
+def create_app(config=None):
+    """Build an app from the environment, with ``config`` applied on top."""
+    app = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+    apply_engine_profile(app)
+    if app.config['RATELIMIT_TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['RATELIMIT_TRUSTED_PROXIES'])
 
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
+    # Configure CORS to be more permissive for development
+    cors.init_app(app, supports_credentials=True, resources={r"/*": {"origins": "*"}},
+                  expose_headers=[replicas.PIN_HEADER])
+    db.init_app(app)
+    jwt.init_app(app)
 
-# Initialize extensions
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
-
-# Initialize extensions
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+    # Deferred so importing this module stays cheap and cycle-free
+    from routes import register_blueprints
+    import compression
+    import identity
+    import revocation
+    import tokens
+    import ratelimit
+    register_blueprints(app)
+    ratelimit.init_app(app)
+    compression.init_app(app)
+    identity.init_app(app)
+    revocation.init_app(app)
+    tokens.init_app(app)
+    replicas.init_app(app)
+    return app
@@ -0,0 +1,100 @@
+"""Concurrent read/write throughput for each database engine profile.
+
+    python benchmarks/engine_profiles.py [seconds]
+
+Every profile runs in its own process against a fresh database. Reader
+threads poll GET /api/users and GET /api/users/<uid> while writer threads
+POST /api/users, all through the app itself. postgres-prod is only run when
+POSTGRES_URL points at a scratch database.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READERS = 8
+WRITERS = 4
+SEED_USERS = 2000
+DEFAULT_SECONDS = 10
+
+
+def run_profile(seconds):
+    sys.path.insert(0, ROOT)
+    from app_init import create_app
+    from extensions import db
+    from flask_jwt_extended import create_access_token
+    from models import User
+    from bulk import new_user_row, insert_user_rows
+    from datetime import datetime
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.now()
+        insert_user_rows([new_user_row({'name': 'Seed %d' % i, 'uid': 'seed-%d' % i}, 'admin', now) for i in range(SEED_USERS)])
+        db.session.commit()
+        token = create_access_token(identity={'uid': 'bench', 'role': 'admin'})
+    headers = {'Authorization': 'Bearer ' + token}
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader(index):
+        client = app.test_client()
+        n = 0
+        while time.monotonic() < deadline:
+            if n % 2:
+                response = client.get('/api/users/seed-%d' % (n % SEED_USERS), headers=headers)
+            else:
+                response = client.get('/api/users?limit=50', headers=headers)
+            count('reads' if response.status_code == 200 else 'errors')
+            n += 1
+
+    def writer(index):
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            response = client.post('/api/users', json={'name': 'Bench', 'uid': str(uuid.uuid4())}, headers=headers)
+            count('writes' if response.status_code == 201 else 'errors')
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        written = User.query.count() - SEED_USERS
+    print(f"{app.config['DB_PROFILE']:<14} reads {counts['reads'] / seconds:>8.0f}/s  "
+          f"writes {counts['writes'] / seconds:>7.0f}/s  errors {counts['errors']:>5}  "
+          f"(rows written {written})")
+
+
+def main(seconds):
+    profiles = [('dev', None), ('sqlite-prod', None)]
+    if os.environ.get('POSTGRES_URL'):
+        profiles.append(('postgres-prod', os.environ['POSTGRES_URL']))
+    else:
+        print('POSTGRES_URL not set; skipping postgres-prod.')
+    print(f'{READERS} readers, {WRITERS} writers, {seconds}s per profile')
+    for profile, url in profiles:
+        env = dict(os.environ, DB_PROFILE=profile)
+        env['DATABASE_URL'] = url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--profile', str(seconds)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--profile']:
+        run_profile(float(sys.argv[2]))
+    else:
+        main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SECONDS)
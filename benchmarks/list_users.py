@@ -0,0 +1,98 @@
+"""Compare the ORM and Core read paths behind GET /api/users.
+
+    python benchmarks/list_users.py [rows]
+
+Seeds a throwaway SQLite database (100k users by default) and times a full
+walk of the table in pages of PAGE_SIZE_MAX rows through each path.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+from app_init import create_app
+from extensions import db
+from models import User
+from pagination import paginate
+from fieldsets import load_fields
+from reads import paginate_rows
+
+DEFAULT_ROWS = 100000
+app = create_app()
+
+
+def seed(count):
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        stamp = start + timedelta(seconds=i)
+        rows.append({
+            'uid': str(uuid.uuid4()),
+            'name': 'Devotee %d' % i,
+            'dob': date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+            'mobile': '98765%05d' % i,
+            'whatsapp': '98765%05d' % i,
+            'address': '%d Temple Street, Vrindavan' % i,
+            'maritalStatus': 'married' if i % 2 else 'single',
+            'createdAt': stamp,
+            'updatedAt': stamp,
+            'createdBy': 'admin',
+            'updatedBy': 'admin'
+        })
+    db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+
+
+def walk_orm(fields=None):
+    cursor, total = None, 0
+    while True:
+        users, cursor, _ = paginate(
+            load_fields(User.query, User, fields, 'createdAt'), [User.createdAt, User.uid], lambda user: (user.createdAt, user.uid),
+            cursor=cursor, limit=app.config['PAGE_SIZE_MAX']
+        )
+        total += len([user.to_dict(fields) for user in users])
+        # The request-scoped session is dropped after every request
+        db.session.remove()
+        if not cursor:
+            return total
+
+
+def walk_core(fields=None):
+    cursor, total = None, 0
+    while True:
+        items, cursor, _ = paginate_rows(
+            User, ('createdAt', 'uid'), fields, cursor=cursor, limit=app.config['PAGE_SIZE_MAX']
+        )
+        total += len(items)
+        db.session.remove()
+        if not cursor:
+            return total
+
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    total = func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {total:>7} rows  {elapsed:7.2f}s  {total / elapsed:>9.0f} rows/s")
+    return elapsed
+
+
+def main(count):
+    with app.app_context():
+        db.create_all()
+        seed(count)
+        print(f"Seeded {count} users; page size {app.config['PAGE_SIZE_MAX']}.")
+        for fields in (None, ('uid', 'name', 'mobile')):
+            label = 'all fields' if fields is None else 'fields=' + ','.join(fields)
+            orm = timed('ORM  ' + label, walk_orm, fields)
+            core = timed('Core ' + label, walk_core, fields)
+            print(f"Core speed-up: {orm / core:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,60 @@
+"""Worker cold start: import plus create_app(), then the first request.
+
+    python benchmarks/startup.py [runs]
+
+Each run is a fresh interpreter, as a newly booted worker would be, against
+a throwaway SQLite database. Prints the median and worst of each phase.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUNS = 10
+
+
+def measure():
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from app_init import create_app
+    app = create_app()
+    booted = time.perf_counter()
+
+    from extensions import db
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(identity={'uid': 'bench', 'role': 'admin'})
+    client = app.test_client()
+
+    first = time.perf_counter()
+    response = client.get('/api/users', headers={'Authorization': 'Bearer ' + token})
+    served = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    print(json.dumps({'boot': booted - started, 'first_request': served - first}))
+
+
+def main(runs):
+    samples = []
+    for _ in range(runs):
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure'],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    print(f'{runs} cold starts')
+    for phase in ('boot', 'first_request'):
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f'{phase:<14} median {statistics.median(values):7.1f} ms   max {max(values):7.1f} ms')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure()
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS)
@@ -0,0 +1,14 @@
+from app_init import create_app
+from extensions import db
+from occasions import build_digest
+
+def build_todays_digest():
+    # Run daily (e.g. from cron just after midnight) so the first read is warm
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        digest = build_digest()
+        print(f"Occasion digest built for {digest.day}.")
+
+if __name__ == '__main__':
+    build_todays_digest()
@@ -0,0 +1,195 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import bindparam
+from extensions import db
+from models import User
+from dates import parse_date, parse_datetime, month_day
+from stats import apply_rollup_deltas, rollup_deltas
+from phones import phone_key
+from occasions import invalidate_digest
+from changelog import record_changes
+from sqlutil import chunks
+
+BULK_MAX_ITEMS = 5000
+
+USER_TEXT_FIELDS = ('name', 'mobile', 'whatsapp', 'address', 'maritalStatus', 'updatedBy')
+USER_DATE_FIELDS = ('dob', 'anniversaryDate')
+
+
+class BulkItemError(ValueError):
+    pass
+
+
+def existing_user_uids(uids):
+    found = {}
+    for chunk in chunks(list(uids)):
+        for uid, updated_at in db.session.query(User.uid, User.updatedAt).filter(User.uid.in_(chunk)):
+            found[uid] = updated_at
+    return found
+
+
+def new_user_row(data, creator, now):
+    if not isinstance(data, dict) or not data.get('name'):
+        raise BulkItemError('Name is required')
+    # Optional: a missing or empty uid gets a generated one
+    if data.get('uid') not in (None, '') and not isinstance(data['uid'], str):
+        raise BulkItemError('uid must be a string')
+    try:
+        dob = parse_date(data.get('dob'))
+        anniversary_date = parse_date(data.get('anniversaryDate'))
+        created_at = parse_datetime(data.get('createdAt')) or now
+    except ValueError:
+        raise BulkItemError('Invalid date format')
+    return {
+        'uid': data.get('uid') or str(uuid.uuid4()),
+        'name': data.get('name'),
+        'dob': dob,
+        'mobile': data.get('mobile', ''),
+        'whatsapp': data.get('whatsapp', ''),
+        'mobileKey': phone_key(data.get('mobile')),
+        'whatsappKey': phone_key(data.get('whatsapp')),
+        'address': data.get('address', ''),
+        'maritalStatus': data.get('maritalStatus', 'single'),
+        'anniversaryDate': anniversary_date,
+        'dobMonthDay': month_day(dob),
+        'anniversaryMonthDay': month_day(anniversary_date),
+        'createdAt': created_at,
+        'updatedAt': now,
+        'createdBy': data.get('createdBy') or creator,
+        'updatedBy': data.get('createdBy') or creator
+    }
+
+
+def user_changes(data, now):
+    if not isinstance(data, dict) or not data.get('uid'):
+        raise BulkItemError('uid is required')
+    if not isinstance(data['uid'], str):
+        raise BulkItemError('uid must be a string')
+    changes = {field: data[field] for field in USER_TEXT_FIELDS if field in data}
+    if 'name' in changes and not changes['name']:
+        raise BulkItemError('Name is required')
+    try:
+        for field in USER_DATE_FIELDS:
+            if field in data:
+                changes[field] = parse_date(data[field])
+    except ValueError:
+        raise BulkItemError('Invalid date format')
+    # Core UPDATEs skip the ORM hooks, so keep the derived keys in step here
+    if 'dob' in changes:
+        changes['dobMonthDay'] = month_day(changes['dob'])
+    if 'anniversaryDate' in changes:
+        changes['anniversaryMonthDay'] = month_day(changes['anniversaryDate'])
+    if 'mobile' in changes:
+        changes['mobileKey'] = phone_key(changes['mobile'])
+    if 'whatsapp' in changes:
+        changes['whatsappKey'] = phone_key(changes['whatsapp'])
+    changes['updatedAt'] = now
+    return changes
+
+
+def insert_user_rows(rows):
+    # executemany INSERT plus the matching rollup deltas; the caller commits
+    if not rows:
+        return
+    db.session.execute(User.__table__.insert(), rows)
+    apply_rollup_deltas(db.session.connection(), rollup_deltas(
+        User, created=[row['updatedAt'] for row in rows]
+    ))
+    invalidate_digest(db.session.connection())
+    record_changes(db.session.connection(), [row['uid'] for row in rows])
+
+
+def bulk_create_users(items, creator):
+    now = datetime.now()
+    results, rows = [], []
+    seen = set()
+    for index, data in enumerate(items):
+        try:
+            row = new_user_row(data, creator, now)
+            if row['uid'] in seen:
+                raise BulkItemError('Duplicate uid in request')
+        except BulkItemError as e:
+            results.append({'index': index, 'status': 'error', 'message': str(e)})
+            continue
+        seen.add(row['uid'])
+        results.append({'index': index, 'uid': row['uid'], 'status': 'created'})
+        rows.append(row)
+
+    existing = existing_user_uids(seen)
+    if existing:
+        for result in results:
+            if result.get('uid') in existing:
+                result.update(status='error', message='User with this ID already exists')
+        rows = [row for row in rows if row['uid'] not in existing]
+
+    insert_user_rows(rows)
+    db.session.commit()
+    return results
+
+
+def bulk_update_users(items):
+    now = datetime.now()
+    results, updates = [], {}
+    for index, data in enumerate(items):
+        try:
+            changes = user_changes(data, now)
+            if data['uid'] in updates:
+                raise BulkItemError('Duplicate uid in request')
+        except BulkItemError as e:
+            results.append({'index': index, 'status': 'error', 'message': str(e)})
+            continue
+        updates[data['uid']] = changes
+        results.append({'index': index, 'uid': data['uid'], 'status': 'updated'})
+
+    existing = existing_user_uids(updates)
+    for result in results:
+        if result.get('uid') and result['uid'] not in existing:
+            result.update(status='error', message='User not found')
+
+    # Items touching the same set of columns share one executemany UPDATE
+    table = User.__table__
+    groups = {}
+    for uid, changes in updates.items():
+        if uid in existing:
+            params = {'v_' + field: value for field, value in changes.items()}
+            params['match_uid'] = uid
+            groups.setdefault(tuple(sorted(changes)), []).append(params)
+    for fields, params in groups.items():
+        statement = table.update().where(table.c.uid == bindparam('match_uid')).values(
+            {field: bindparam('v_' + field) for field in fields}
+        )
+        db.session.execute(statement, params)
+
+    moved = [(existing[uid], now) for uid in updates if uid in existing]
+    apply_rollup_deltas(db.session.connection(), rollup_deltas(User, moved=moved))
+    invalidate_digest(db.session.connection())
+    record_changes(db.session.connection(), [uid for uid in updates if uid in existing])
+    db.session.commit()
+    return results
+
+
+def bulk_delete_users(uids):
+    results = []
+    seen = set()
+    for index, uid in enumerate(uids):
+        if not isinstance(uid, str) or not uid:
+            results.append({'index': index, 'status': 'error', 'message': 'uid is required'})
+        elif uid in seen:
+            results.append({'index': index, 'status': 'error', 'message': 'Duplicate uid in request'})
+        else:
+            seen.add(uid)
+            results.append({'index': index, 'uid': uid, 'status': 'deleted'})
+
+    existing = existing_user_uids(seen)
+    for result in results:
+        if result.get('uid') and result['uid'] not in existing:
+            result.update(status='error', message='User not found')
+
+    table = User.__table__
+    for chunk in chunks(list(existing)):
+        db.session.execute(table.delete().where(table.c.uid.in_(chunk)))
+    apply_rollup_deltas(db.session.connection(), rollup_deltas(User, deleted=list(existing.values())))
+    invalidate_digest(db.session.connection())
+    record_changes(db.session.connection(), list(existing), deleted=True)
+    db.session.commit()
+    return results
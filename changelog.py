@@ -0,0 +1,92 @@
+from datetime import datetime
+from extensions import db
+from models import User, UserChange
+from sqlalchemy import event, exists, select, false
+from sqlalchemy.orm import Session
+from sqlutil import chunks
+
+# Readers page with seq > cursor, which is only safe if seq values become
+# visible in order. SQLite runs one write transaction at a time, so they do.
+# PostgreSQL hands out sequence values at insert, not commit, so writers to
+# the log take a lock held until commit that readers do not wait on. Other
+# engines get no feed rather than one that can skip changes.
+ORDERED_DIALECTS = {'sqlite', 'postgresql'}
+
+
+def change_feed_supported():
+    return db.engine.dialect.name in ORDERED_DIALECTS
+
+
+def record_changes(connection, uids, deleted=False):
+    # Move each uid to the head of the log: one row per user, so the log grows
+    # with the number of users rather than the number of writes
+    table = UserChange.__table__
+    uids = list(uids)
+    if not uids:
+        return
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('LOCK TABLE %s IN EXCLUSIVE MODE' % table.name)
+    now = datetime.now()
+    for chunk in chunks(uids):
+        connection.execute(table.delete().where(table.c.uid.in_(chunk)))
+        connection.execute(table.insert(), [{'uid': uid, 'deleted': deleted, 'changedAt': now} for uid in chunk])
+
+
+def parse_since(raw):
+    if raw in (None, ''):
+        return 0
+    try:
+        since = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid since cursor')
+    if since < 0:
+        raise ValueError('Invalid since cursor')
+    return since
+
+
+def changes_since(since, limit):
+    """Changes after ``since`` in seq order, as ``(changes, cursor, has_more)``.
+
+    Live rows come back with the user attached; deleted ones as tombstones.
+    The cursor is the seq of the last change returned (``since`` when none).
+    """
+    rows = db.session.query(UserChange, User).outerjoin(User, User.uid == UserChange.uid).filter(
+        UserChange.seq > since
+    ).order_by(UserChange.seq).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes = []
+    for change, user in rows:
+        if change.deleted or user is None:
+            changes.append({'uid': change.uid, 'deleted': True})
+        else:
+            changes.append({'uid': change.uid, 'deleted': False, 'user': user.to_dict()})
+    cursor = rows[-1][0].seq if rows else since
+    return changes, str(cursor), has_more
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_user_changes(session, flush_context):
+    # Same transaction as the write, so a rolled back write leaves no entry
+    written = [obj.uid for obj in session.new if isinstance(obj, User)]
+    written += [obj.uid for obj in session.dirty if isinstance(obj, User) and session.is_modified(obj)]
+    removed = [obj.uid for obj in session.deleted if isinstance(obj, User)]
+    if written:
+        record_changes(session.connection(), written)
+    if removed:
+        record_changes(session.connection(), removed, deleted=True)
+
+
+def backfill_change_log():
+    # Users that predate the log enter it once, oldest first, so a client
+    # syncing from zero receives every row
+    table = UserChange.__table__
+    source = User.__table__
+    logged = exists().where(table.c.uid == source.c.uid)
+    result = db.session.execute(table.insert().from_select(
+        ['uid', 'deleted', 'changedAt'],
+        select(source.c.uid, false(), source.c.updatedAt).where(~logged).order_by(source.c.createdAt, source.c.uid)
+    ))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,95 @@
+import zlib
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # only gzip is offered without it
+        brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html'
+}
+
+
+def _gzip_compressor(level):
+    # wbits 16 + MAX_WBITS gives a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush
+    )
+
+
+def _brotli_compressor(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def _encodings():
+    # Server preference when the client rates several equally
+    encodings = {'gzip': (_gzip_compressor, 'COMPRESS_GZIP_LEVEL')}
+    if brotli is not None:
+        encodings = {'br': (_brotli_compressor, 'COMPRESS_BR_LEVEL'), **encodings}
+    return encodings
+
+
+def negotiate_encoding():
+    encodings = _encodings()
+    best = request.accept_encodings.best_match(list(encodings))
+    return best, encodings.get(best)
+
+
+def _compress_stream(chunks, compressor):
+    # Flush after every chunk the app yields, so a streamed export reaches the
+    # client as it is produced rather than when the compressor's buffer fills
+    compress, flush, finish = compressor
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+
+    name, encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    make_compressor, level_key = encoding
+    compressor = make_compressor(current_app.config[level_key])
+
+    if response.is_streamed:
+        # Length unknown up front, so the size threshold does not apply
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        compress, _, finish = compressor
+        response.set_data(compress(data) + finish())
+    response.headers['Content-Encoding'] = name
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
@@ -0,0 +1,44 @@
+import hashlib
+from datetime import timezone
+from flask import request, Response
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
+from extensions import db
+from jsonio import jsonify
+
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def http_date(value):
+    # Stored timestamps are naive local time; HTTP dates are UTC
+    return value.astimezone(timezone.utc) if value else None
+
+
+def collection_version(model):
+    """``(max(updatedAt), count)`` for a table; both come off the updatedAt index.
+
+    Every write path stamps updatedAt, so an insert or update moves the max and
+    a delete moves the count.
+    """
+    return db.session.query(func.max(model.updatedAt), func.count()).select_from(model).one()
+
+
+def conditional_json(build, etag, last_modified=None):
+    """``jsonify(build())``, or an empty 304 when the client's copy is current.
+
+    ``build`` is only called for a 200, so an unchanged poll skips the row fetch
+    and the serialization.
+    """
+    last_modified = http_date(last_modified)
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = jsonify(build())
+    else:
+        response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # Cache, but revalidate on every poll
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
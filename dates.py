@@ -0,0 +1,48 @@
+from datetime import datetime, date
+
+# Day-first formats are what the devotee registers use; ISO is tried first
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y')
+
+
+def parse_datetime(value):
+    """Parse an ISO-8601 timestamp into a naive local datetime; '' and None give None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    value = str(value).strip()
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        # Stored timestamps are naive local time, like datetime.now()
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_date(value):
+    """Parse a calendar date; full ISO timestamps are truncated to their date."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+
+
+def month_day(value):
+    # 4 July -> 704; sorts in calendar order for index range scans
+    return value.month * 100 + value.day if value else None
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
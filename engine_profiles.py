@@ -0,0 +1,92 @@
+from threading import Lock
+from flask_sqlalchemy import _EngineConnector
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Applied on every new SQLite connection. WAL lets readers run alongside the
+# single writer, and busy_timeout makes a second writer wait for the lock
+# instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -65536,  # negative means KiB: 64 MiB
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY'
+}
+
+ENGINE_PROFILES = {
+    # Flask-SQLAlchemy defaults: a fresh connection per checkout, no pragmas
+    'dev': {},
+    'sqlite-prod': {
+        'pragmas': SQLITE_PRAGMAS,
+        # A pool keeps the per-connection page cache and mmap warm; pooled
+        # connections move between request threads but are never shared
+        'engine_options': {
+            'poolclass': QueuePool,
+            'pool_size': 8,
+            'max_overflow': 8,
+            'connect_args': {'check_same_thread': False, 'timeout': 5}
+        }
+    },
+    'postgres-prod': {
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800
+        }
+    }
+}
+
+def apply_engine_profile(app, name=None):
+    """Merge the named profile into the app config before the engine is built.
+
+    Options already in SQLALCHEMY_ENGINE_OPTIONS win over the profile's. The
+    profile's pragmas go to SQLALCHEMY_PRAGMAS, which PragmaConnector applies
+    to this app's own engines.
+    """
+    name = name or app.config.get('DB_PROFILE', 'dev')
+    if name not in ENGINE_PROFILES:
+        raise RuntimeError(f'Unknown database profile {name!r}')
+    profile = ENGINE_PROFILES[name]
+    options = dict(profile.get('engine_options', {}))
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.config['SQLALCHEMY_PRAGMAS'] = dict(profile.get('pragmas', {}))
+    return name
+
+
+def listen_for_pragmas(engine, pragmas):
+    # Runs on each new DBAPI connection of this engine only
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', set_pragmas)
+
+
+class PragmaConnector(_EngineConnector):
+    """Engine connector that sets up the app's pragmas on every engine it
+    builds, the default bind and the replica alike."""
+
+    def __init__(self, sa, app, bind=None):
+        super().__init__(sa, app, bind)
+        self._prepared = None
+        self._prepare_lock = Lock()
+
+    def get_engine(self):
+        engine = super().get_engine()
+        with self._prepare_lock:
+            if engine is not self._prepared:
+                listen_for_pragmas(engine, dict(self._app.config.get('SQLALCHEMY_PRAGMAS') or {}))
+                self._prepared = engine
+        return engine
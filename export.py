@@ -0,0 +1,41 @@
+from jsonio import encoder
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+
+
+def _batches(query, batch_size):
+    # stream_results keeps a server-side cursor open; yield_per hydrates one batch at a time
+    encode = encoder()
+    batch = []
+    for row in query.execution_options(stream_results=True).yield_per(batch_size):
+        batch.append(encode(row.to_dict()))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_stream(query, batch_size=EXPORT_BATCH_SIZE):
+    for batch in _batches(query, batch_size):
+        yield b'\n'.join(batch) + b'\n'
+
+
+def json_array_stream(query, batch_size=EXPORT_BATCH_SIZE):
+    # Send the opening bracket straight away so the first byte doesn't wait on the query
+    yield b'['
+    separator = b''
+    for batch in _batches(query, batch_size):
+        yield separator + b','.join(batch)
+        separator = b','
+    yield b']'
+
+
+def export_stream(query, fmt, batch_size=EXPORT_BATCH_SIZE):
+    if fmt == 'ndjson':
+        return ndjson_stream(query, batch_size)
+    return json_array_stream(query, batch_size)
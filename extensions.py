@@ -0,0 +1,8 @@
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+from replicas import RoutingSQLAlchemy
+
+# Created once at import and bound to each app by create_app()
+db = RoutingSQLAlchemy()
+jwt = JWTManager()
+cors = CORS()
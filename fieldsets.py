@@ -0,0 +1,28 @@
+from sqlalchemy.orm import load_only
+
+
+def parse_fields(raw, model):
+    """Fields named in a ``?fields=uid,name`` parameter, or None for all of them."""
+    if raw is None:
+        return None
+    fields = []
+    for field in raw.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    if not fields:
+        raise ValueError('No fields requested')
+    unknown = [field for field in fields if field not in model.SERIALIZED_FIELDS]
+    if unknown:
+        raise ValueError('Unknown fields: ' + ', '.join(unknown))
+    # Canonical order, so any ordering of the same fields is one selection
+    return tuple(field for field in model.SERIALIZED_FIELDS if field in fields)
+
+
+def load_fields(query, model, fields, *required):
+    # SELECT only the requested columns plus the ones the endpoint itself reads
+    # (cursor keys, validators); load_only always keeps the primary key
+    if fields is None:
+        return query
+    names = list(fields) + [name for name in required if name not in fields]
+    return query.options(load_only(*[getattr(model, name) for name in names]))
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from models import Admin, Volunteer
+
+
+class IdentityCache:
+    """In-process LRU of principals keyed by ``(role, uid)``, each entry kept
+    for at most ``ttl`` seconds.
+
+    Entries are plain dicts rather than model instances, so they outlive the
+    session that loaded them. Writes in this process invalidate explicitly;
+    the TTL bounds how stale another worker's copy can be.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxSize': self.size,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def _cache():
+    return current_app.extensions['identity_cache']
+
+
+def _key(role, uid):
+    # Any role other than admin resolves against volunteers
+    return ('admin' if role == 'admin' else 'volunteer', uid)
+
+
+def get_principal(role, uid):
+    """``{'uid', 'email', 'role'}`` for the principal, or None if it is gone.
+
+    Misses are not cached, so a principal created after a failed lookup is
+    found on the next call.
+    """
+    key = _key(role, uid)
+    cache = _cache()
+    principal = cache.get(key)
+    if principal is None:
+        model = Admin if key[0] == 'admin' else Volunteer
+        user = model.query.get(uid)
+        if user is None:
+            return None
+        principal = {'uid': user.uid, 'email': user.email, 'role': key[0]}
+        cache.put(key, principal)
+    return principal
+
+
+def invalidate_principal(role, uid):
+    # Call after the write commits, so a concurrent read cannot re-cache the
+    # old row
+    _cache().invalidate(_key(role, uid))
+
+
+def identity_cache_stats():
+    return _cache().stats()
+
+
+def init_app(app):
+    app.extensions['identity_cache'] = IdentityCache(
+        app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL']
+    )
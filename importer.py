@@ -0,0 +1,262 @@
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from extensions import db
+from models import ImportJob, ImportRowError
+from bulk import new_user_row, insert_user_rows, BulkItemError
+from dates import parse_date
+from sqlalchemy.exc import IntegrityError
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+# Spreadsheet headers are matched after lower-casing and dropping punctuation
+HEADER_ALIASES = {
+    'uid': 'uid',
+    'name': 'name',
+    'fullname': 'name',
+    'dob': 'dob',
+    'dateofbirth': 'dob',
+    'birthday': 'dob',
+    'mobile': 'mobile',
+    'mobileno': 'mobile',
+    'mobilenumber': 'mobile',
+    'phone': 'mobile',
+    'whatsapp': 'whatsapp',
+    'whatsappno': 'whatsapp',
+    'whatsappnumber': 'whatsapp',
+    'address': 'address',
+    'maritalstatus': 'maritalStatus',
+    'anniversary': 'anniversaryDate',
+    'anniversarydate': 'anniversaryDate',
+    'weddinganniversary': 'anniversaryDate'
+}
+
+MARITAL_STATUSES = {
+    'single': 'single',
+    'unmarried': 'single',
+    's': 'single',
+    'married': 'married',
+    'm': 'married',
+    'widowed': 'widowed',
+    'divorced': 'divorced'
+}
+
+
+class ImportRowInvalid(ValueError):
+    pass
+
+
+def _openpyxl():
+    # Imported on first use: it is optional and slow to import, and most
+    # workers never see an XLSX upload
+    try:
+        import openpyxl
+    except ImportError:
+        return None
+    return openpyxl
+
+
+def xlsx_supported():
+    return _openpyxl() is not None
+
+
+def import_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def _header_key(header):
+    return HEADER_ALIASES.get(re.sub(r'[^a-z]', '', str(header or '').lower()))
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for values in csv.reader(f):
+            yield values
+
+
+def _read_xlsx(path):
+    workbook = _openpyxl().load_workbook(path, read_only=True, data_only=True)
+    try:
+        for values in workbook.active.iter_rows(values_only=True):
+            yield values
+    finally:
+        workbook.close()
+
+
+def read_rows(path, fmt):
+    """Yield ``(row_number, raw_dict)`` for each data row, streaming the file."""
+    reader = _read_xlsx(path) if fmt == 'xlsx' else _read_csv(path)
+    headers = None
+    for row_number, values in enumerate(reader, start=1):
+        if headers is None:
+            headers = [_header_key(value) for value in values]
+            if 'name' not in headers:
+                raise ImportRowInvalid('The first row must contain a Name column')
+            continue
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield row_number, {
+            key: value for key, value in zip(headers, values) if key is not None
+        }
+
+
+def count_rows(path, fmt):
+    if fmt == 'xlsx':
+        workbook = _openpyxl().load_workbook(path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    return max(sum(1 for _ in _read_csv(path)) - 1, 0)
+
+
+def normalize_phone_text(value):
+    if value in (None, ''):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets hand numeric cells back as floats
+        value = int(value)
+    value = str(value).strip()
+    digits = re.sub(r'\D', '', value)
+    if not 10 <= len(digits) <= 15:
+        raise ImportRowInvalid(f'Invalid phone number: {value}')
+    return ('+' if value.startswith('+') else '') + digits
+
+
+def normalize_row(raw):
+    data = {}
+    name = ' '.join(str(raw.get('name') or '').split())
+    if not name:
+        raise ImportRowInvalid('Name is required')
+    data['name'] = name
+    if raw.get('uid'):
+        data['uid'] = str(raw['uid']).strip()
+    data['mobile'] = normalize_phone_text(raw.get('mobile'))
+    data['whatsapp'] = normalize_phone_text(raw.get('whatsapp'))
+    data['address'] = str(raw.get('address') or '').strip()
+
+    status = str(raw.get('maritalStatus') or 'single').strip().lower()
+    if status not in MARITAL_STATUSES:
+        raise ImportRowInvalid(f'Unknown marital status: {status}')
+    data['maritalStatus'] = MARITAL_STATUSES[status]
+
+    for field in ('dob', 'anniversaryDate'):
+        try:
+            data[field] = parse_date(raw.get(field))
+        except ValueError:
+            raise ImportRowInvalid(f'Invalid date for {field}: {raw.get(field)}')
+    if data['anniversaryDate'] and data['maritalStatus'] == 'single':
+        raise ImportRowInvalid('Anniversary date given for a single person')
+    return data
+
+
+def _raw_text(raw):
+    return json.dumps(raw, default=str)
+
+
+def _record_batch(job, rows, errors):
+    # Insert a batch in its own transaction. If the batch as a whole is rejected
+    # (e.g. a duplicate uid) retry row by row so one bad row only fails itself.
+    processed = len(rows) + len(errors)
+    inserted = 0
+    try:
+        insert_user_rows([row for _, row, _ in rows])
+        db.session.commit()
+        inserted = len(rows)
+    except Exception:
+        db.session.rollback()
+        for row_number, row, raw in rows:
+            try:
+                insert_user_rows([row])
+                db.session.commit()
+                inserted += 1
+            except IntegrityError:
+                db.session.rollback()
+                errors.append((row_number, 'User with this ID already exists', raw))
+            except Exception as e:
+                db.session.rollback()
+                errors.append((row_number, f'Could not save row: {str(e)}', raw))
+
+    for row_number, message, raw in errors:
+        db.session.add(ImportRowError(jobId=job.id, rowNumber=row_number, message=message, raw=_raw_text(raw)))
+    job.processedRows += processed
+    job.insertedRows += inserted
+    job.failedRows += len(errors)
+    db.session.commit()
+
+
+def run_import(app, job_id, path, batch_size=IMPORT_BATCH_SIZE):
+    with app.app_context():
+        job = ImportJob.query.get(job_id)
+        try:
+            job.status = 'running'
+            job.totalRows = count_rows(path, job.format)
+            db.session.commit()
+
+            now = datetime.now()
+            rows, errors = [], []
+            for row_number, raw in read_rows(path, job.format):
+                try:
+                    row = new_user_row(normalize_row(raw), job.createdBy, now)
+                    rows.append((row_number, row, raw))
+                except (ImportRowInvalid, BulkItemError) as e:
+                    errors.append((row_number, str(e), raw))
+                if len(rows) + len(errors) >= batch_size:
+                    _record_batch(job, rows, errors)
+                    rows, errors = [], []
+            if rows or errors:
+                _record_batch(job, rows, errors)
+
+            job.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.message = str(e)
+        finally:
+            job.finishedAt = datetime.now()
+            db.session.commit()
+            db.session.remove()
+            os.remove(path)
+
+
+def start_import(app, upload, fmt, creator):
+    # Spool the upload to disk so the worker thread can stream it after the
+    # request has finished
+    fd, path = tempfile.mkstemp(suffix='.' + fmt)
+    with os.fdopen(fd, 'wb') as f:
+        upload.save(f)
+
+    job = ImportJob(
+        id=str(uuid.uuid4()),
+        filename=upload.filename,
+        format=fmt,
+        createdBy=creator
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    threading.Thread(target=run_import, args=(app, job.id, path), daemon=True).start()
+    return job
+
+
+def error_report(job_id):
+    # Stream the per-row errors as CSV without loading them all
+    query = ImportRowError.query.filter_by(jobId=job_id).order_by(ImportRowError.rowNumber)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['row', 'error', 'data'])
+    for error in query.yield_per(IMPORT_BATCH_SIZE):
+        writer.writerow([error.rowNumber, error.message, error.raw])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,66 @@
+import json
+from datetime import date, datetime
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder is used instead
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default)
+
+
+# Encoders by name, each returning UTF-8 bytes; JSON_BACKEND picks one and
+# 'auto' takes the fastest that is installed
+JSON_BACKENDS = {'stdlib': _stdlib_dumps}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = _orjson_dumps
+
+
+def backend_name():
+    name = current_app.config.get('JSON_BACKEND', 'auto')
+    if name == 'auto':
+        return 'orjson' if 'orjson' in JSON_BACKENDS else 'stdlib'
+    if name not in JSON_BACKENDS:
+        raise RuntimeError(f'JSON backend {name!r} is not available')
+    return name
+
+
+def encoder():
+    # Resolve once when encoding many values, e.g. a streamed export
+    return JSON_BACKENDS[backend_name()]
+
+
+def dumps(obj):
+    return encoder()(obj)
+
+
+def raw_json(body, status=None):
+    """Response around JSON that is already encoded: bytes, text, or an
+    iterable of bytes chunks, passed to the client as they are."""
+    return current_app.response_class(body, status=status, mimetype=JSON_MIMETYPE)
+
+
+def jsonify(*args, **kwargs):
+    # Drop-in for flask.jsonify: compact output in the order the dict was built
+    if args and kwargs:
+        raise TypeError('jsonify() takes either positional or keyword arguments, not both')
+    if len(args) == 1:
+        payload = args[0]
+    else:
+        payload = list(args) if args else kwargs
+    return raw_json(dumps(payload))
@@ -0,0 +1,248 @@
+from app_init import create_app
+from extensions import db
+from models import User, Volunteer, Admin, StatsRollup, PHONE_KEY_TYPE
+from stats import rebuild_rollups
+from accounts import backfill_accounts
+from changelog import backfill_change_log
+from search import ensure_search_index
+from phones import phone_key
+from dates import parse_date, parse_datetime, month_day
+from sqlalchemy import inspect, select, text, String, Text, DateTime
+from sqlalchemy.sql import table, column
+from datetime import datetime
+
+MIGRATION_CHUNK_SIZE = 500
+
+# Columns that used to be ISO strings and are now DateTime/Date
+TEMPORAL_COLUMNS = {
+    User: ['createdAt', 'updatedAt', 'dob', 'anniversaryDate'],
+    Volunteer: ['createdAt', 'updatedAt', 'dob', 'anniversaryDate'],
+    Admin: ['updatedAt', 'dob']
+}
+
+def ensure_indexes():
+    # db.create_all() only creates indexes together with new tables, so add any
+    # index declared on the models that an existing database is missing
+    for model_table in db.metadata.sorted_tables:
+        for index in model_table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    print("Indexes are up to date.")
+
+def _quote(name):
+    return db.engine.dialect.identifier_preparer.quote(name)
+
+def ensure_columns():
+    # db.create_all() never alters existing tables, so add columns that were
+    # introduced on the models since the database was created
+    existing_tables = inspect(db.engine).get_table_names()
+    for model_table in db.metadata.sorted_tables:
+        if model_table.name not in existing_tables:
+            continue
+        existing = {col['name'] for col in inspect(db.engine).get_columns(model_table.name)}
+        for col in model_table.columns:
+            if col.name not in existing:
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql('ALTER TABLE %s ADD COLUMN %s %s' % (
+                        _quote(model_table.name), _quote(col.name), col.type.compile(dialect=db.engine.dialect)))
+                print(f"Added column {model_table.name}.{col.name}.")
+
+def _convert_row(model, names, raw, now):
+    values = {}
+    invalid = 0
+    for name in names:
+        parse = parse_datetime if isinstance(model.__table__.c[name].type, DateTime) else parse_date
+        try:
+            values[name] = parse(raw[name])
+        except ValueError:
+            values[name] = None
+            invalid += 1
+    # Keyset pagination and the dashboard need both timestamps on every row;
+    # one ``now`` per run, so the catch-up pass sees the same fallback
+    if 'createdAt' in values and values['createdAt'] is None:
+        values['createdAt'] = values.get('updatedAt') or now
+    if 'updatedAt' in values and values['updatedAt'] is None:
+        values['updatedAt'] = values.get('createdAt') or now
+    return values, invalid
+
+def _legacy_columns(model, names):
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite stores DateTime/Date as text, so values are rewritten in place
+        return list(names)
+    existing = {col['name']: col['type'] for col in inspect(db.engine).get_columns(model.__tablename__)}
+    return [name for name in names if isinstance(existing.get(name), (String, Text))]
+
+def _convert_chunk(conn, model, names, source, target, changes_for, last_uid, chunk_size, now):
+    # Converts the next chunk after last_uid; returns (rows, converted, invalid)
+    rows = conn.execute(
+        source.select().where(source.c.uid > last_uid).order_by(source.c.uid).limit(chunk_size)
+    ).mappings().all()
+    converted, invalid = 0, 0
+    for row in rows:
+        values, row_invalid = _convert_row(model, names, row, now)
+        invalid += row_invalid
+        changes = changes_for(row, values)
+        if changes:
+            conn.execute(target.update().where(target.c.uid == row['uid']).values(**changes))
+            converted += 1
+    return rows, converted, invalid
+
+def migrate_temporal_columns(chunk_size=MIGRATION_CHUNK_SIZE):
+    # Rows are converted in short per-chunk transactions keyed on uid, so the
+    # table is never locked for the whole run. Returns the number of rows changed.
+    #
+    # Server databases get a typed shadow column that is swapped in at the end.
+    # Rows written while the copy runs are caught up in the swap transaction,
+    # which on PostgreSQL holds an EXCLUSIVE lock so writes wait (reads do not)
+    # until the swap commits. Other server engines need writes stopped for the
+    # run. Each step can be rerun: the shadow column is reused, only rows
+    # whose shadow value differs are written, and swapped columns are skipped.
+    dialect = db.engine.dialect
+    in_place = dialect.name == 'sqlite'
+    now = datetime.now()
+    total_converted = 0
+    for model, names in TEMPORAL_COLUMNS.items():
+        names = _legacy_columns(model, names)
+        if not names:
+            continue
+        tablename = model.__tablename__
+        if in_place:
+            source = target = table(tablename, column('uid'), *[column(name) for name in names])
+            processors = {
+                name: model.__table__.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+                for name in names
+            }
+
+            def changes_for(row, values):
+                changes = {}
+                for name, value in values.items():
+                    stored = processors[name](value) if processors[name] else value
+                    if stored != row[name]:
+                        changes[name] = stored
+                return changes
+        else:
+            existing = {col['name'] for col in inspect(db.engine).get_columns(tablename)}
+            for name in names:
+                if name + '_migrated' in existing:
+                    continue
+                col_type = model.__table__.c[name].type.compile(dialect=dialect)
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql('ALTER TABLE %s ADD COLUMN %s %s' % (
+                        _quote(tablename), _quote(name + '_migrated'), col_type))
+            shadows = [column(name + '_migrated', model.__table__.c[name].type) for name in names]
+            source = table(tablename, column('uid'), *[column(name) for name in names], *shadows)
+            target = table(tablename, column('uid'), *[
+                column(name + '_migrated', model.__table__.c[name].type) for name in names
+            ])
+
+            def changes_for(row, values):
+                return {
+                    name + '_migrated': value for name, value in values.items()
+                    if row[name + '_migrated'] != value
+                }
+
+        last_uid, converted, invalid = '', 0, 0
+        while True:
+            with db.engine.begin() as conn:
+                rows, chunk_converted, chunk_invalid = _convert_chunk(
+                    conn, model, names, source, target, changes_for, last_uid, chunk_size, now)
+            converted += chunk_converted
+            invalid += chunk_invalid
+            if not rows:
+                break
+            last_uid = rows[-1]['uid']
+
+        if not in_place:
+            with db.engine.begin() as conn:
+                if dialect.name == 'postgresql':
+                    conn.exec_driver_sql('LOCK TABLE %s IN EXCLUSIVE MODE' % _quote(tablename))
+                # Rows inserted or updated since their chunk was copied
+                last_uid = ''
+                while True:
+                    rows, chunk_converted, _ = _convert_chunk(
+                        conn, model, names, source, target, changes_for, last_uid, chunk_size, now)
+                    converted += chunk_converted
+                    if not rows:
+                        break
+                    last_uid = rows[-1]['uid']
+                for name in names:
+                    conn.exec_driver_sql('ALTER TABLE %s DROP COLUMN %s' % (_quote(tablename), _quote(name)))
+                    conn.exec_driver_sql('ALTER TABLE %s RENAME COLUMN %s TO %s' % (
+                        _quote(tablename), _quote(name + '_migrated'), _quote(name)))
+
+        total_converted += converted
+        print(f"Converted {converted} {tablename} rows ({invalid} unparseable values cleared).")
+    return total_converted
+
+def backfill_derived_columns(model, derive, chunk_size=MIGRATION_CHUNK_SIZE):
+    # Same chunked keyset walk as the temporal migration; derive(row) returns
+    # the values the derived columns should hold
+    source = model.__table__
+    last_uid, updated = '', 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                select(source).where(source.c.uid > last_uid).order_by(source.c.uid).limit(chunk_size)
+            ).all()
+            for row in rows:
+                values = derive(row)
+                if any(getattr(row, name) != value for name, value in values.items()):
+                    conn.execute(source.update().where(source.c.uid == row.uid).values(**values))
+                    updated += 1
+        if not rows:
+            break
+        last_uid = rows[-1].uid
+    return updated
+
+def ensure_phone_key_collation():
+    # Phone key columns created before PHONE_KEY_TYPE use the database's
+    # default collation on PostgreSQL; the type change rebuilds their indexes
+    if db.engine.dialect.name != 'postgresql':
+        return
+    col_type = PHONE_KEY_TYPE.compile(dialect=db.engine.dialect)
+    with db.engine.begin() as conn:
+        for model in (User, Volunteer):
+            for name in ('mobileKey', 'whatsappKey'):
+                collation = conn.execute(text(
+                    'SELECT collation_name FROM information_schema.columns '
+                    'WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column'
+                ), {'table': model.__tablename__, 'column': name}).scalar()
+                if collation != 'C':
+                    conn.exec_driver_sql('ALTER TABLE %s ALTER COLUMN %s TYPE %s' % (
+                        _quote(model.__tablename__), _quote(name), col_type))
+                    print(f"Set C collation on {model.__tablename__}.{name}.")
+
+def _phone_keys(row):
+    return {'mobileKey': phone_key(row.mobile), 'whatsappKey': phone_key(row.whatsapp)}
+
+def _month_days(row):
+    return {'dobMonthDay': month_day(row.dob), 'anniversaryMonthDay': month_day(row.anniversaryDate)}
+
+def backfill_keys():
+    for model in (User, Volunteer):
+        updated = backfill_derived_columns(model, _phone_keys)
+        print(f"Backfilled phone keys on {updated} {model.__tablename__} rows.")
+    updated = backfill_derived_columns(User, _month_days)
+    print(f"Backfilled birthday/anniversary keys on {updated} users rows.")
+
+def migrate_database():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ensure_columns()
+        converted = migrate_temporal_columns()
+        ensure_phone_key_collation()
+        ensure_indexes()
+        if converted or not StatsRollup.query.first():
+            rebuild_rollups()
+            print("Dashboard rollups built.")
+        added = backfill_accounts()
+        print(f"Accounts index is up to date ({added} rows added).")
+        backfill_keys()
+        logged = backfill_change_log()
+        print(f"Added {logged} existing users to the change log.")
+        if ensure_search_index():
+            print("Full-text search index rebuilt.")
+        print("Database migration complete.")
+
+if __name__ == '__main__':
+    migrate_database()
@@ -1,79 +1,105 @@
-from app_init import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import db
+from passwords import hash_password, verify_password
 from datetime import datetime
+from dates import isoformat, month_day
+from phones import phone_key
+
+_TEMPORAL_TYPES = (db.Date, db.DateTime)
+
+# Reversed phone digits, searched by range (phones.suffix_range). The range
+# needs bytewise ordering: SQLite compares text that way already, while
+# PostgreSQL's default locale collation can sort ':' before digits
+PHONE_KEY_TYPE = db.String(20).with_variant(db.String(20, collation='C'), 'postgresql')
+
+def serialize(obj, fields):
+    # Only the requested attributes are read, so columns left out with
+    # load_only are never lazy-loaded; dates go out as ISO strings
+    columns = obj.__table__.c
+    return {
+        field: isoformat(getattr(obj, field)) if isinstance(columns[field].type, _TEMPORAL_TYPES) else getattr(obj, field)
+        for field in fields
+    }
 
 class User(db.Model):
     __tablename__ = 'users'
+    # Keyset pagination order, so a page is one index range scan
+    __table_args__ = (db.Index('ix_users_createdAt_uid', 'createdAt', 'uid'),)
     
     uid = db.Column(db.String(50), primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    dob = db.Column(db.String(20))
+    dob = db.Column(db.Date)
     mobile = db.Column(db.String(20))
     whatsapp = db.Column(db.String(20))
+    mobileKey = db.Column(PHONE_KEY_TYPE, index=True)
+    whatsappKey = db.Column(PHONE_KEY_TYPE, index=True)
     address = db.Column(db.Text)
     maritalStatus = db.Column(db.String(20), default='single')
-    anniversaryDate = db.Column(db.String(20))
-    createdAt = db.Column(db.String(30), default=lambda: datetime.now().isoformat())
-    updatedAt = db.Column(db.String(30), default=lambda: datetime.now().isoformat())
+    anniversaryDate = db.Column(db.Date)
+    dobMonthDay = db.Column(db.Integer, index=True)
+    anniversaryMonthDay = db.Column(db.Integer, index=True)
+    createdAt = db.Column(db.DateTime, default=datetime.now, index=True)
+    updatedAt = db.Column(db.DateTime, default=datetime.now, index=True)
     createdBy = db.Column(db.String(100))
     updatedBy = db.Column(db.String(100))
 
-    def to_dict(self):
-        return {
-            'uid': self.uid,
-            'name': self.name,
-            'dob': self.dob,
-            'mobile': self.mobile,
-            'whatsapp': self.whatsapp,
-            'address': self.address,
-            'maritalStatus': self.maritalStatus,
-            'anniversaryDate': self.anniversaryDate,
-            'createdAt': self.createdAt,
-            'updatedAt': self.updatedAt,
-            'createdBy': self.createdBy,
-            'updatedBy': self.updatedBy
-        }
+    SERIALIZED_FIELDS = (
+        'uid', 'name', 'dob', 'mobile', 'whatsapp', 'address', 'maritalStatus',
+        'anniversaryDate', 'createdAt', 'updatedAt', 'createdBy', 'updatedBy'
+    )
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields or self.SERIALIZED_FIELDS)
 
 class Volunteer(db.Model):
     __tablename__ = 'volunteers'
+    __table_args__ = (db.Index('ix_volunteers_createdAt_uid', 'createdAt', 'uid'),)
     
     uid = db.Column(db.String(50), primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(200))
-    dob = db.Column(db.String(20))
+    dob = db.Column(db.Date)
     mobile = db.Column(db.String(20))
     whatsapp = db.Column(db.String(20))
+    mobileKey = db.Column(PHONE_KEY_TYPE, index=True)
+    whatsappKey = db.Column(PHONE_KEY_TYPE, index=True)
     address = db.Column(db.Text)
     maritalStatus = db.Column(db.String(20), default='single')
-    anniversaryDate = db.Column(db.String(20))
-    createdAt = db.Column(db.String(30), default=lambda: datetime.now().isoformat())
-    updatedAt = db.Column(db.String(30), default=lambda: datetime.now().isoformat())
+    anniversaryDate = db.Column(db.Date)
+    createdAt = db.Column(db.DateTime, default=datetime.now, index=True)
+    updatedAt = db.Column(db.DateTime, default=datetime.now, index=True)
     createdBy = db.Column(db.String(100), default='admin')
     role = db.Column(db.String(20), default='volunteer')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
         
-    def to_dict(self):
-        return {
-            'uid': self.uid,
-            'name': self.name,
-            'email': self.email,
-            'dob': self.dob,
-            'mobile': self.mobile,
-            'whatsapp': self.whatsapp,
-            'address': self.address,
-            'maritalStatus': self.maritalStatus,
-            'anniversaryDate': self.anniversaryDate,
-            'createdAt': self.createdAt,
-            'updatedAt': self.updatedAt,
-            'createdBy': self.createdBy,
-            'role': self.role
-        }
+    SERIALIZED_FIELDS = (
+        'uid', 'name', 'email', 'dob', 'mobile', 'whatsapp', 'address', 'maritalStatus',
+        'anniversaryDate', 'createdAt', 'updatedAt', 'createdBy', 'role'
+    )
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields or self.SERIALIZED_FIELDS)
+
+def _fill_phone_keys(mapper, connection, target):
+    # Normalized, reversed phone numbers for exact and last-digits lookups
+    target.mobileKey = phone_key(target.mobile)
+    target.whatsappKey = phone_key(target.whatsapp)
+
+def _fill_month_days(mapper, connection, target):
+    # MMDD keys behind the upcoming birthdays/anniversaries range scans
+    target.dobMonthDay = month_day(target.dob)
+    target.anniversaryMonthDay = month_day(target.anniversaryDate)
+
+for _model in (User, Volunteer):
+    db.event.listen(_model, 'before_insert', _fill_phone_keys)
+    db.event.listen(_model, 'before_update', _fill_phone_keys)
+db.event.listen(User, 'before_insert', _fill_month_days)
+db.event.listen(User, 'before_update', _fill_month_days)
 
 class Admin(db.Model):
     __tablename__ = 'admins'
@@ -82,28 +108,114 @@ class Admin(db.Model):
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(200))
-    dob = db.Column(db.String(20))
+    dob = db.Column(db.Date)
     mobile = db.Column(db.String(20))
     whatsapp = db.Column(db.String(20))
     address = db.Column(db.Text)
-    updatedAt = db.Column(db.String(30), default=lambda: datetime.now().isoformat())
+    updatedAt = db.Column(db.DateTime, default=datetime.now, index=True)
     role = db.Column(db.String(20), default='admin')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
         
+    SERIALIZED_FIELDS = (
+        'uid', 'name', 'email', 'dob', 'mobile', 'whatsapp', 'address', 'updatedAt',
+        'role'
+    )
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields or self.SERIALIZED_FIELDS)
+
+class StatsRollup(db.Model):
+    __tablename__ = 'stats_rollups'
+    
+    # Dashboard counters kept up to date by stats.py; bucket is '' for totals
+    # or a 'YYYY-MM-DD' day for the time-windowed metrics
+    metric = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True, default='')
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class Account(db.Model):
+    __tablename__ = 'accounts'
+    
+    # One row per admin or volunteer, kept in sync by accounts.py, so login and
+    # signup resolve an email with a single indexed lookup
+    uid = db.Column(db.String(50), primary_key=True)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    role = db.Column(db.String(20), nullable=False)
+    password_hash = db.Column(db.String(200))
+
+class ImportJob(db.Model):
+    __tablename__ = 'import_jobs'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    filename = db.Column(db.String(255))
+    format = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    totalRows = db.Column(db.Integer)
+    processedRows = db.Column(db.Integer, nullable=False, default=0)
+    insertedRows = db.Column(db.Integer, nullable=False, default=0)
+    failedRows = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.Text)
+    createdBy = db.Column(db.String(100))
+    createdAt = db.Column(db.DateTime, default=datetime.now)
+    finishedAt = db.Column(db.DateTime)
+
     def to_dict(self):
         return {
-            'uid': self.uid,
-            'name': self.name,
-            'email': self.email,
-            'dob': self.dob,
-            'mobile': self.mobile,
-            'whatsapp': self.whatsapp,
-            'address': self.address,
-            'updatedAt': self.updatedAt,
-            'role': self.role
+            'id': self.id,
+            'filename': self.filename,
+            'format': self.format,
+            'status': self.status,
+            'totalRows': self.totalRows,
+            'processedRows': self.processedRows,
+            'insertedRows': self.insertedRows,
+            'failedRows': self.failedRows,
+            'message': self.message,
+            'createdBy': self.createdBy,
+            'createdAt': isoformat(self.createdAt),
+            'finishedAt': isoformat(self.finishedAt)
         }
+
+class ImportRowError(db.Model):
+    __tablename__ = 'import_errors'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jobId = db.Column(db.String(50), db.ForeignKey('import_jobs.id'), nullable=False, index=True)
+    rowNumber = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    raw = db.Column(db.Text)
+
+class OccasionDigest(db.Model):
+    __tablename__ = 'occasion_digests'
+    
+    # Today's birthdays and anniversaries, computed once and served as stored JSON
+    day = db.Column(db.Date, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    generatedAt = db.Column(db.DateTime, default=datetime.now)
+
+class UserChange(db.Model):
+    __tablename__ = 'user_change_log'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    # Latest change per user, kept by changelog.py; seq only ever grows (no
+    # rowid reuse on SQLite) so it doubles as the delta-sync cursor
+    seq = db.Column(db.Integer, primary_key=True)
+    uid = db.Column(db.String(50), unique=True, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changedAt = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    # key is a token's jti, or 'uid:<uid>' to revoke every token a principal
+    # was issued up to revokedAt. seq is the cursor workers sync from, and
+    # rows are pruned once expiresAt has passed.
+    seq = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    revokedAt = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expiresAt = db.Column(db.DateTime, nullable=False, index=True)
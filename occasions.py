@@ -0,0 +1,107 @@
+import calendar
+from datetime import date, timedelta
+from sqlalchemy import event, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models import User, OccasionDigest
+from dates import month_day, isoformat
+from jsonio import dumps
+from replicas import use_primary
+
+MAX_WINDOW_DAYS = 366
+OCCASION_TYPES = {
+    'birthday': ('dob', 'dobMonthDay'),
+    'anniversary': ('anniversaryDate', 'anniversaryMonthDay')
+}
+
+
+def month_day_ranges(start, days):
+    """Inclusive (low, high) MMDD ranges covering ``days`` days from ``start``."""
+    if days >= MAX_WINDOW_DAYS:
+        return [(101, 1231)]
+    end = start + timedelta(days=days - 1)
+    high = month_day(end)
+    # In a common year Feb 29 occasions fall on Feb 28
+    if end.month == 2 and end.day == 28 and not calendar.isleap(end.year):
+        high = 229
+    if end.year == start.year:
+        return [(month_day(start), high)]
+    # The window wraps past 31 December
+    return [(month_day(start), 1231), (101, high)]
+
+
+def next_occurrence(original, start):
+    year = start.year
+    if month_day(original) < month_day(start):
+        year += 1
+    if original.month == 2 and original.day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return date(year, original.month, original.day)
+
+
+def upcoming_occasions(start, days, types=tuple(OCCASION_TYPES), marital_status=None):
+    ranges = month_day_ranges(start, days)
+    occasions = []
+    for occasion_type in types:
+        date_attr, key_attr = OCCASION_TYPES[occasion_type]
+        key = getattr(User, key_attr)
+        query = User.query.filter(or_(*[key.between(low, high) for low, high in ranges]))
+        if occasion_type == 'anniversary':
+            # Anniversaries only count for married devotees
+            query = query.filter(User.maritalStatus == 'married')
+        if marital_status:
+            query = query.filter(User.maritalStatus == marital_status)
+
+        for user in query:
+            original = getattr(user, date_attr)
+            occurs_on = next_occurrence(original, start)
+            occasions.append({
+                'type': occasion_type,
+                'date': isoformat(occurs_on),
+                'daysUntil': (occurs_on - start).days,
+                'years': occurs_on.year - original.year,
+                'user': user.to_dict()
+            })
+
+    occasions.sort(key=lambda occasion: (occasion['daysUntil'], occasion['user']['name']))
+    return occasions
+
+
+def todays_digest(today=None):
+    today = today or date.today()
+    digest = OccasionDigest.query.get(today)
+    if digest is None:
+        digest = build_digest(today)
+    # Served as stored, without decoding and re-encoding it
+    return digest.payload
+
+
+def build_digest(today=None):
+    today = today or date.today()
+    use_primary(db.session)
+    payload = dumps({'date': isoformat(today), 'occasions': upcoming_occasions(today, 1)}).decode('utf-8')
+    digest = OccasionDigest.query.get(today) or OccasionDigest(day=today)
+    digest.payload = payload
+    db.session.add(digest)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent first request of the day stored it first; serve theirs
+        db.session.rollback()
+        digest = OccasionDigest.query.get(today) or OccasionDigest(day=today, payload=payload)
+    return digest
+
+
+def invalidate_digest(connection):
+    # Any user write may change today's list; the next read rebuilds it
+    table = OccasionDigest.__table__
+    connection.execute(table.delete().where(table.c.day == date.today()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_digest_on_user_write(session, flush_context):
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, User):
+            invalidate_digest(session.connection())
+            return
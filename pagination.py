@@ -0,0 +1,122 @@
+import base64
+import json
+from flask import current_app
+from sqlalchemy import and_, or_, Date, DateTime
+from dates import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def page_size(raw):
+    default = current_app.config.get('PAGE_SIZE_DEFAULT', DEFAULT_PAGE_SIZE)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', MAX_PAGE_SIZE)
+    if raw in (None, ''):
+        return default
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit')
+    if size < 1:
+        raise ValueError('Invalid limit')
+    return min(size, maximum)
+
+
+def _encode_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _decode_value(column, value):
+    # Cursors carry every key as a non-empty string, timestamps in ISO form;
+    # anything else was not produced by encode_cursor
+    if not isinstance(value, str) or not value:
+        raise ValueError('Invalid cursor')
+    if isinstance(column.type, DateTime):
+        value = parse_datetime(value)
+    elif isinstance(column.type, Date):
+        value = parse_date(value)
+    if value is None:
+        raise ValueError('Invalid cursor')
+    return value
+
+
+def encode_cursor(direction, key):
+    key = [_encode_value(value) for value in key]
+    payload = json.dumps({'d': direction, 'k': key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, key = payload['d'], payload['k']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('next', 'prev') or not isinstance(key, list):
+        raise ValueError('Invalid cursor')
+    return direction, key
+
+
+def _after(columns, key):
+    # Row-value comparison (a, b) > (x, y) spelled out so every backend can use the index
+    column, rest = columns[0], columns[1:]
+    value, rest_key = key[0], key[1:]
+    if not rest:
+        return column > value
+    return or_(column > value, and_(column == value, _after(rest, rest_key)))
+
+
+def _before(columns, key):
+    column, rest = columns[0], columns[1:]
+    value, rest_key = key[0], key[1:]
+    if not rest:
+        return column < value
+    return or_(column < value, and_(column == value, _before(rest, rest_key)))
+
+
+def _all(query):
+    return query.all()
+
+
+def paginate(query, columns, key_of, cursor=None, limit=None, fetch=_all):
+    """Keyset pagination over ``columns``, which must be unique together.
+
+    ``key_of(row)`` returns the sort key of a fetched row and ``fetch(query)``
+    runs the final query, so a Core select can be paged as well as an ORM
+    query. Returns ``(rows, next_cursor, prev_cursor)``.
+    """
+    size = page_size(limit)
+    direction, key = decode_cursor(cursor) if cursor else ('next', None)
+    if key is not None:
+        if len(key) != len(columns):
+            raise ValueError('Invalid cursor')
+        try:
+            key = [_decode_value(column, value) for column, value in zip(columns, key)]
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+
+    if direction == 'next':
+        if key is not None:
+            # The bound on the leading column lets the planner range-scan the
+            # index instead of collecting every later row and sorting it
+            query = query.filter(columns[0] >= key[0], _after(columns, key))
+        query = query.order_by(*[column.asc() for column in columns])
+    else:
+        query = query.filter(columns[0] <= key[0], _before(columns, key))
+        query = query.order_by(*[column.desc() for column in columns])
+
+    # Fetch one extra row to know whether another page exists
+    rows = fetch(query.limit(size + 1))
+    has_more = len(rows) > size
+    rows = rows[:size]
+
+    if direction == 'prev':
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, key is not None
+
+    next_cursor = encode_cursor('next', key_of(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor('prev', key_of(rows[0])) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
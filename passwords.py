@@ -0,0 +1,59 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:260000'
+DEFAULT_PBKDF2_ITERATIONS = 260000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+
+def _pool():
+    # Hashing is CPU bound, so it runs on a bounded pool instead of on every
+    # request thread at once; pbkdf2 releases the GIL so threads scale too
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = _config('PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                if _config('PASSWORD_HASH_EXECUTOR', 'thread') == 'process':
+                    _executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor
+
+
+def normalize_method(method):
+    # werkzeug records pbkdf2 hashes as pbkdf2:<digest>:<iterations>, so
+    # spell out whatever the config leaves implicit to compare like with like
+    parts = method.split(':')
+    if parts[0] != 'pbkdf2':
+        return method
+    digest = parts[1] if len(parts) > 1 and parts[1] else 'sha256'
+    iterations = int(parts[2]) if len(parts) > 2 and parts[2] else DEFAULT_PBKDF2_ITERATIONS
+    return 'pbkdf2:%s:%d' % (digest, iterations)
+
+
+def hash_method():
+    return normalize_method(_config('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD))
+
+
+def hash_password(password):
+    return _pool().submit(generate_password_hash, password, hash_method()).result()
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _pool().submit(check_password_hash, password_hash, password).result()
+
+
+def needs_rehash(password_hash):
+    return bool(password_hash) and password_hash.split('$', 1)[0] != hash_method()
@@ -0,0 +1,37 @@
+import re
+
+DEFAULT_COUNTRY_CODE = '91'
+NATIONAL_NUMBER_LENGTH = 10
+SUFFIX_MIN_DIGITS = 4
+
+
+def normalize_phone(value, country_code=DEFAULT_COUNTRY_CODE):
+    """E.164 digits without the '+': '098765 43210' and '+91 98765-43210' both give '919876543210'."""
+    raw = str(value or '').strip()
+    digits = re.sub(r'\D', '', raw)
+    if not digits:
+        return None
+    if raw.startswith('+'):
+        return digits
+    if digits.startswith('00'):
+        # International dialling prefix
+        return digits[2:]
+    national = digits.lstrip('0')
+    if len(national) == NATIONAL_NUMBER_LENGTH:
+        return country_code + national
+    return digits
+
+
+def phone_key(value):
+    # Stored reversed so that "ends with these digits" becomes a prefix, i.e.
+    # an index range scan; an exact match is plain equality on the same column
+    normalized = normalize_phone(value)
+    return normalized[::-1] if normalized else None
+
+
+def suffix_range(digits):
+    # Every key starting with the reversed suffix sorts in [prefix, prefix + ':'),
+    # ':' being the character right after '9' in bytewise (C collation) order,
+    # which models.PHONE_KEY_TYPE gives the key columns
+    prefix = re.sub(r'\D', '', digits)[::-1]
+    return prefix, prefix + ':'
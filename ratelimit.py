@@ -0,0 +1,152 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import request, g
+from jsonio import jsonify
+
+RATE_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+# Per endpoint: token buckets keyed by client IP and by the email in the JSON
+# body, as 'N/period' (N is also the burst), and 'concurrency', the number of
+# requests one worker serves at once. RATE_LIMITS overrides entries by endpoint.
+DEFAULT_RATE_LIMITS = {
+    'auth.login': {'ip': '30/minute', 'email': '10/minute', 'concurrency': 8},
+    'auth.signup': {'ip': '10/minute', 'email': '5/minute', 'concurrency': 4},
+    'auth.refresh': {'ip': '120/minute'},
+    'volunteers.create_volunteer': {'concurrency': 4},
+    'volunteers.update_volunteer': {'concurrency': 4},
+    'users.bulk_create': {'ip': '30/minute', 'concurrency': 2},
+    'users.bulk_update': {'ip': '30/minute', 'concurrency': 2},
+    'users.bulk_delete': {'ip': '30/minute', 'concurrency': 2},
+    'users.create_import': {'ip': '10/minute', 'concurrency': 2}
+}
+
+# Slot held by the current request, released on teardown
+_SLOT = '_ratelimit_slot'
+
+
+def parse_rate(rate):
+    """'N/period' as ``(tokens per second, burst)``."""
+    try:
+        count, period = rate.split('/')
+        count, seconds = int(count), RATE_PERIODS[period.strip()]
+    except (ValueError, KeyError):
+        raise RuntimeError(f'Invalid rate limit {rate!r}')
+    if count < 1:
+        raise RuntimeError(f'Invalid rate limit {rate!r}')
+    return count / seconds, count
+
+
+class MemoryBackend:
+    """Token buckets in this worker's memory, evicting the least recently
+    used key past ``max_keys``.
+
+    A shared backend (e.g. one on Redis) only needs the same ``take`` method,
+    registered in RATELIMIT_BACKENDS and picked with RATELIMIT_BACKEND.
+    """
+
+    def __init__(self, app):
+        self.max_keys = app.config['RATELIMIT_MAX_KEYS']
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        # 0 if a token was taken, otherwise seconds until one is available
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+RATELIMIT_BACKENDS = {'memory': MemoryBackend}
+
+
+def _client_ip():
+    # The socket peer, or the forwarded client once RATELIMIT_TRUSTED_PROXIES
+    # has create_app() wrap the app in ProxyFix
+    return request.remote_addr or 'unknown'
+
+
+def _client_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+KEY_FUNCTIONS = {'ip': _client_ip, 'email': _client_email}
+
+
+def _error(message, status, retry_after):
+    response = jsonify({'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class RateLimiter:
+    def __init__(self, app):
+        name = app.config['RATELIMIT_BACKEND']
+        if name not in RATELIMIT_BACKENDS:
+            raise RuntimeError(f'Rate limit backend {name!r} is not available')
+        self.backend = RATELIMIT_BACKENDS[name](app)
+        # Parsed once here so a request only does dict lookups
+        self.buckets = {}
+        self.slots = {}
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(app.config['RATE_LIMITS'])
+        for endpoint, rules in limits.items():
+            unknown = set(rules) - set(KEY_FUNCTIONS) - {'concurrency'}
+            if unknown:
+                raise RuntimeError(f'Unknown rate limit keys for {endpoint}: {", ".join(sorted(unknown))}')
+            buckets = [(kind, KEY_FUNCTIONS[kind]) + parse_rate(rules[kind]) for kind in KEY_FUNCTIONS if rules.get(kind)]
+            if buckets:
+                self.buckets[endpoint] = buckets
+            if rules.get('concurrency'):
+                self.slots[endpoint] = threading.BoundedSemaphore(rules['concurrency'])
+        self.limited = set(self.buckets) | set(self.slots)
+
+    def before_request(self):
+        # Unlimited endpoints cost one set lookup
+        endpoint = request.endpoint
+        if endpoint not in self.limited or request.method == 'OPTIONS':
+            return None
+
+        for kind, key_function, rate, burst in self.buckets.get(endpoint, ()):
+            value = key_function()
+            if value is None:
+                continue
+            wait = self.backend.take(f'{endpoint}:{kind}:{value}', rate, burst)
+            if wait:
+                return _error('Too many requests', 429, wait)
+
+        slot = self.slots.get(endpoint)
+        if slot is not None:
+            if not slot.acquire(blocking=False):
+                # Shed load rather than queue behind requests already running
+                return _error('Server is busy, please retry', 503, 1)
+            setattr(g, _SLOT, slot)
+        return None
+
+    def teardown_request(self, exc=None):
+        slot = g.pop(_SLOT, None)
+        if slot is not None:
+            slot.release()
+
+
+def init_app(app):
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    limiter = RateLimiter(app)
+    app.extensions['ratelimiter'] = limiter
+    app.before_request(limiter.before_request)
+    app.teardown_request(limiter.teardown_request)
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from sqlalchemy import select, Date, DateTime
+from extensions import db
+from dates import isoformat
+from pagination import paginate
+
+# Read-only list path: a Core select turned straight into dicts, with no ORM
+# instances, identity map or per-row to_dict() call
+
+# Field selections kept built; bounded since ?fields= is client input
+ROW_MAPPING_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=ROW_MAPPING_CACHE_SIZE)
+def row_mapping(model, fields):
+    """``(columns, to_dict)`` for ``fields`` of ``model``, built once per pair.
+
+    ``to_dict(row)`` gives the same dict as ``model.to_dict(fields)`` for a row
+    whose leading columns are ``columns``.
+    """
+    columns = [model.__table__.c[field] for field in fields]
+    converters = [isoformat if isinstance(column.type, (Date, DateTime)) else None for column in columns]
+    plan = [(field, index, convert) for index, (field, convert) in enumerate(zip(fields, converters))]
+    if any(converters):
+        def to_dict(row):
+            return {field: convert(row[index]) if convert else row[index] for field, index, convert in plan}
+    else:
+        def to_dict(row):
+            return dict(zip(fields, row))
+    return columns, to_dict
+
+
+def _execute(statement):
+    return db.session.execute(statement).all()
+
+
+def paginate_rows(model, key_fields, fields=None, cursor=None, limit=None):
+    """``paginate`` over a Core select of ``fields``, returning plain dicts."""
+    fields = tuple(fields or model.SERIALIZED_FIELDS)
+    columns, to_dict = row_mapping(model, fields)
+    # Cursor keys that are not being returned ride along after the fields
+    extra = [name for name in key_fields if name not in fields]
+    names = fields + tuple(extra)
+    positions = [names.index(name) for name in key_fields]
+
+    table = model.__table__
+    statement = select(*columns, *[table.c[name] for name in extra])
+    rows, next_cursor, prev_cursor = paginate(
+        statement,
+        [table.c[name] for name in key_fields],
+        lambda row: tuple(row[position] for position in positions),
+        cursor=cursor,
+        limit=limit,
+        fetch=_execute
+    )
+    return [to_dict(row) for row in rows], next_cursor, prev_cursor
@@ -0,0 +1,15 @@
+from app_init import create_app
+from extensions import db
+from stats import rebuild_rollups, read_dashboard_stats, compute_dashboard_stats
+
+def rebuild_stats():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        rebuild_rollups()
+        print("Dashboard rollups rebuilt.")
+        print("Rollups:   ", read_dashboard_stats())
+        print("Aggregates:", compute_dashboard_stats())
+
+if __name__ == '__main__':
+    rebuild_stats()
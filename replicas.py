@@ -0,0 +1,123 @@
+import threading
+import time
+from flask import request, current_app, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+from engine_profiles import PragmaConnector
+
+REPLICA_BIND = 'replica'
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+# After a write, the writer reads from the primary until a deadline so it
+# sees its own writes despite replica lag. The deadline is kept per JWT uid
+# in this worker, and returned in PIN_HEADER for the client to echo back to
+# other workers. PIN_COOKIE is a fallback for same-site browser clients.
+PIN_HEADER = 'X-DB-Primary-Until'
+PIN_COOKIE = 'db_primary_until'
+# Session.info flag: this session has written, or must read fresh data
+PRIMARY_ONLY = 'primary_only'
+
+
+def replica_configured(app):
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+class PrimaryPins:
+    """Per-uid "read from the primary until" deadlines for this worker."""
+
+    def __init__(self):
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def pin(self, uid, until):
+        with self._lock:
+            self._until[uid] = until
+            if len(self._until) > 10000:
+                now = time.time()
+                self._until = {key: value for key, value in self._until.items() if value > now}
+
+    def pinned(self, uid, now):
+        return self._until.get(uid, 0) > now
+
+
+def _request_uid():
+    # Identity of a request that went through @jwt_required(), if any
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        return None
+    return identity.get('uid') if isinstance(identity, dict) else None
+
+
+def _echoed_pin(raw, now):
+    # Only deadlines a write could have set count, so a client cannot pin
+    # itself to the primary indefinitely
+    try:
+        until = float(raw)
+    except (TypeError, ValueError):
+        return False
+    return now < until <= now + current_app.config['REPLICA_PIN_SECONDS']
+
+
+def pinned_to_primary():
+    now = time.time()
+    uid = _request_uid()
+    if uid is not None and current_app.extensions['replica_pins'].pinned(uid, now):
+        return True
+    return _echoed_pin(request.headers.get(PIN_HEADER), now) or _echoed_pin(request.cookies.get(PIN_COOKIE), now)
+
+
+class RoutingSession(SignallingSession):
+    """Sends the reads of read-only requests to the replica bind.
+
+    Flushes, DML and everything after them in the same request go to the
+    primary, as does all work outside a request (scripts, import jobs).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info[PRIMARY_ONLY] = True
+        elif not self.info.get(PRIMARY_ONLY) and self._reads_from_replica():
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+    def _reads_from_replica(self):
+        return (
+            replica_configured(self.app)
+            and has_request_context()
+            and request.method in READ_METHODS
+            and not pinned_to_primary()
+        )
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def make_connector(self, app=None, bind=None):
+        return PragmaConnector(self, self.get_app(app), bind)
+
+
+def use_primary(session):
+    # For a read-then-write inside a GET, where a stale read would clash
+    session.info[PRIMARY_ONLY] = True
+
+
+def pin_primary_after_write(response):
+    # after_request hook: a successful write pins its writer to the primary
+    # for REPLICA_PIN_SECONDS
+    if (replica_configured(current_app) and request.method not in READ_METHODS
+            and response.status_code < 400):
+        seconds = current_app.config['REPLICA_PIN_SECONDS']
+        until = time.time() + seconds
+        uid = _request_uid()
+        if uid is not None:
+            current_app.extensions['replica_pins'].pin(uid, until)
+        response.headers[PIN_HEADER] = '%.3f' % until
+        response.set_cookie(PIN_COOKIE, '%.3f' % until, max_age=seconds, httponly=True, samesite='Lax')
+    return response
+
+
+def init_app(app):
+    app.extensions['replica_pins'] = PrimaryPins()
+    app.after_request(pin_primary_after_write)
@@ -1,6 +1,8 @@
-from app_init import app, db
+from app_init import create_app
+from extensions import db
 
 def reset_database():
+    app = create_app()
     with app.app_context():
         # Drop all tables
         db.drop_all()
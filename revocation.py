@@ -0,0 +1,219 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from flask_jwt_extended.config import config as jwt_config
+from sqlalchemy import select
+from extensions import db, jwt
+from models import RevokedToken
+from tokens import FAMILY_CLAIM
+from sqlutil import upsert
+
+PRINCIPAL_PREFIX = 'uid:'
+FAMILY_PREFIX = 'family:'
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about ``error_rate`` false
+    positives once ``capacity`` keys are in. Keys cannot be removed; the
+    filter is rebuilt instead."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest(), 'little')
+        position, step, size = digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1, self.size
+        for _ in range(self.hashes):
+            position = (position + step) % size
+            yield position
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        # Stops at the first clear bit, which for an absent key is usually
+        # the first or second probe
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class Denylist:
+    """This worker's filter over revoked_tokens.
+
+    Every ``sync_interval`` seconds the first request to come along adds rows
+    past the last seen seq. Every ``prune_interval`` seconds, or once the
+    filter is over capacity, expired rows are deleted and the filter is
+    rebuilt from what is left. The rebuild also picks up rows whose seq
+    committed out of order.
+    """
+
+    def __init__(self, capacity, error_rate, sync_interval, prune_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self.filter = BloomFilter(capacity, error_rate)
+        self.cursor = 0
+        self.synced_at = None
+        self.pruned_at = None
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        self.filter.add(key)
+
+    def might_contain(self, key):
+        return key in self.filter
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and self.synced_at is not None and now - self.synced_at < self.sync_interval:
+            return
+        # Another thread is already syncing; the current filter will do
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            if (self.pruned_at is None or now - self.pruned_at >= self.prune_interval
+                    or self.filter.count > self.filter.capacity):
+                self._rebuild()
+                self.pruned_at = now
+            else:
+                self._catch_up()
+            self.synced_at = now
+        finally:
+            self._lock.release()
+
+    def _catch_up(self):
+        table = RevokedToken.__table__
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.seq, table.c.key).where(table.c.seq > self.cursor).order_by(table.c.seq)
+            ).all()
+        for row in rows:
+            self.filter.add(row.key)
+        if rows:
+            self.cursor = rows[-1].seq
+
+    def _rebuild(self):
+        table = RevokedToken.__table__
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.expiresAt <= datetime.now()))
+            rows = conn.execute(select(table.c.seq, table.c.key)).all()
+        rebuilt = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        for row in rows:
+            rebuilt.add(row.key)
+        self.cursor = max((row.seq for row in rows), default=self.cursor)
+        self.filter = rebuilt
+
+
+def _denylist():
+    return current_app.extensions['denylist']
+
+
+def _expires_at(timestamp):
+    # Naive local time, like the rest of the schema
+    return datetime.fromtimestamp(timestamp) if timestamp else datetime.max
+
+
+def _longest_token_lifetime():
+    lifetimes = [jwt_config.access_expires, jwt_config.refresh_expires]
+    if not all(lifetimes):
+        return None
+    return max(lifetime.total_seconds() for lifetime in lifetimes)
+
+
+def _principal_uid(payload):
+    identity = payload.get(jwt_config.identity_claim_key)
+    return identity.get('uid') if isinstance(identity, dict) else None
+
+
+def _store(connection, key, expires_at):
+    # A repeat revocation moves revokedAt forward; seq stays, since workers
+    # have already seen the key
+    upsert(
+        connection, RevokedToken.__table__,
+        {'key': key, 'revokedAt': datetime.now(), 'expiresAt': expires_at}, ['key'],
+        lambda excluded: {'revokedAt': excluded.revokedAt, 'expiresAt': excluded.expiresAt}
+    )
+    _denylist().add(key)
+
+
+def _revoke_all(prefix, value, connection=None):
+    # Tokens issued up to now under ``value``; the entry can go once the
+    # longest-lived of them has expired
+    lifetime = _longest_token_lifetime()
+    expires_at = _expires_at(time.time() + lifetime if lifetime is not None else None)
+    _store(connection or db.session.connection(), prefix + value, expires_at)
+
+
+def revoke_token(payload):
+    """Deny one token (a decoded JWT) until it expires. Joins the caller's
+    transaction."""
+    _store(db.session.connection(), payload['jti'], _expires_at(payload.get('exp')))
+
+
+def revoke_principal(uid):
+    """Deny every token issued to ``uid`` so far, including unexpired ones
+    issued before a delete. Joins the caller's transaction."""
+    _revoke_all(PRINCIPAL_PREFIX, uid)
+
+
+def revoke_family(payload):
+    """Deny every token descended from the same login as ``payload``. Joins
+    the caller's transaction."""
+    if payload.get(FAMILY_CLAIM):
+        _revoke_all(FAMILY_PREFIX, payload[FAMILY_CLAIM])
+
+
+def _refresh_reused(payload):
+    # A refresh token is revoked once it has been rotated, so seeing it again
+    # means it leaked: end its family, which also cuts off whoever rotated it
+    with db.engine.begin() as conn:
+        _revoke_all(FAMILY_PREFIX, payload[FAMILY_CLAIM], conn)
+
+
+def is_revoked(payload):
+    # Not revoked unless the filter says it might be, so the common path is
+    # a few hash probes in memory. Possible hits are confirmed on the primary.
+    denylist = _denylist()
+    denylist.sync()
+    uid = _principal_uid(payload)
+    family = payload.get(FAMILY_CLAIM)
+    candidates = (payload.get('jti'), uid and PRINCIPAL_PREFIX + uid, family and FAMILY_PREFIX + family)
+    keys = [key for key in candidates if key and denylist.might_contain(key)]
+    if not keys:
+        return False
+
+    table = RevokedToken.__table__
+    with db.engine.connect() as conn:
+        rows = conn.execute(
+            select(table.c.key, table.c.revokedAt).where(table.c.key.in_(keys), table.c.expiresAt > datetime.now())
+        ).all()
+    issued_at = datetime.fromtimestamp(payload.get('iat', 0))
+    if any(row.key == payload.get('jti') for row in rows):
+        if payload.get('type') == 'refresh' and family:
+            _refresh_reused(payload)
+        return True
+    return any(issued_at <= row.revokedAt for row in rows)
+
+
+def init_app(app):
+    app.extensions['denylist'] = Denylist(
+        app.config['REVOCATION_FILTER_CAPACITY'],
+        app.config['REVOCATION_FILTER_ERROR_RATE'],
+        app.config['REVOCATION_SYNC_SECONDS'],
+        app.config['REVOCATION_PRUNE_SECONDS']
+    )
+    jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: is_revoked(jwt_payload))
@@ -1,10 +1,18 @@
-from flask import request, jsonify
+from flask import Blueprint, request
+from jsonio import jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import app, db
-from models import Admin, Volunteer, User
-from datetime import datetime, timedelta
+from extensions import db
+from models import Admin
+from stats import read_dashboard_stats
+from identity import invalidate_principal, identity_cache_stats
+from dates import parse_date
+from conditional import conditional_json, make_etag
+from datetime import datetime
 
-@app.route('/api/admin/dashboard-stats', methods=['GET'])
+admin_bp = Blueprint('admin', __name__)
+
+# Admin routes
+@admin_bp.route('/api/admin/dashboard-stats', methods=['GET'])
 @jwt_required()
 def get_dashboard_stats():
     # Verify admin role
@@ -12,36 +20,18 @@ def get_dashboard_stats():
     if current_user.get('role') != 'admin':
         return jsonify({'message': 'Unauthorized'}), 403
     
-    # Get total volunteers
-    total_volunteers = Volunteer.query.count()
-    
-    # Get total users
-    total_users = User.query.count()
-    
-    # Calculate new this month
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    new_this_month = 0
-    
-    volunteers = Volunteer.query.all()
-    for volunteer in volunteers:
-        if volunteer.createdAt:
-            created_date = datetime.fromisoformat(volunteer.createdAt.replace('Z', '+00:00'))
-            if created_date.month == current_month and created_date.year == current_year:
-                new_this_month += 1
-    
-    # Calculate active users (updated in last 30 days)
-    thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-    active_users = User.query.filter(User.updatedAt > thirty_days_ago).count()
+    return jsonify(read_dashboard_stats()), 200
+
+@admin_bp.route('/api/admin/identity-cache', methods=['GET'])
+@jwt_required()
+def get_identity_cache_stats():
+    current_user = get_jwt_identity()
+    if current_user.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
     
-    return jsonify({
-        'totalVolunteers': total_volunteers,
-        'totalUsers': total_users,
-        'newThisMonth': new_this_month,
-        'activeUsers': active_users
-    }), 200
+    return jsonify(identity_cache_stats()), 200
 
-@app.route('/api/admin/profile', methods=['GET'])
+@admin_bp.route('/api/admin/profile', methods=['GET'])
 @jwt_required()
 def get_admin_profile():
     current_user = get_jwt_identity()
@@ -52,9 +42,9 @@ def get_admin_profile():
     if not admin:
         return jsonify({'message': 'Admin profile not found'}), 404
     
-    return jsonify(admin.to_dict()), 200
+    return conditional_json(admin.to_dict, make_etag('admin', admin.uid, admin.updatedAt), admin.updatedAt)
 
-@app.route('/api/admin/profile', methods=['PUT'])
+@admin_bp.route('/api/admin/profile', methods=['PUT'])
 @jwt_required()
 def update_admin_profile():
     current_user = get_jwt_identity()
@@ -77,16 +67,19 @@ def update_admin_profile():
     if 'name' in data:
         admin.name = data['name']
     if 'dob' in data:
-        admin.dob = data['dob']
+        try:
+            admin.dob = parse_date(data['dob'])
+        except ValueError:
+            return jsonify({'message': 'Invalid date format'}), 400
     if 'mobile' in data:
         admin.mobile = data['mobile']
     if 'whatsapp' in data:
         admin.whatsapp = data['whatsapp']
     if 'address' in data:
         admin.address = data['address']
-    if 'updatedAt' in data:
-        admin.updatedAt = data['updatedAt']
+    admin.updatedAt = datetime.now()
     
     db.session.commit()
+    invalidate_principal('admin', admin.uid)
     
     return jsonify(admin.to_dict()), 200
@@ -1,12 +1,25 @@
-from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from app import app, db
-from models import Volunteer, Admin
+from flask import Blueprint, request, current_app
+from jsonio import jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from extensions import db
+from models import Volunteer
+from accounts import find_account, upgrade_password_hash
+from identity import get_principal
+from revocation import revoke_token, revoke_family
+from tokens import issue_tokens, FAMILY_CLAIM
+from passwords import hash_password, verify_password, needs_rehash
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import uuid
+from datetime import datetime
 
-@app.route('/api/auth/login', methods=['POST'])
+auth_bp = Blueprint('auth', __name__)
+
+# Auth routes - ensure all routes are prefixed with /api
+@auth_bp.route('/api/auth/login', methods=['POST', 'OPTIONS'])
 def login():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
     data = request.get_json()
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'message': 'Missing email or password'}), 400
@@ -14,36 +27,34 @@ def login():
     email = data.get('email')
     password = data.get('password')
     
-    # Check if user is an admin
-    admin = Admin.query.filter_by(email=email).first()
-    if admin and check_password_hash(admin.password_hash, password):
-        token = create_access_token(identity={'uid': admin.uid, 'role': 'admin'})
+    # One indexed lookup resolves both admins and volunteers
+    account = find_account(email)
+    if account and verify_password(account.password_hash, password):
+        if needs_rehash(account.password_hash):
+            try:
+                upgrade_password_hash(account, password)
+            except SQLAlchemyError:
+                # Keep the old hash; it is retried on the next login
+                db.session.rollback()
+                current_app.logger.exception('Could not upgrade the password hash for %s', account.uid)
+        
         return jsonify({
-            'token': token,
+            **issue_tokens(account.uid, account.role),
             'user': {
-                'uid': admin.uid,
-                'email': admin.email,
-                'role': 'admin'
-            }
-        }), 200
-    
-    # Check if user is a volunteer
-    volunteer = Volunteer.query.filter_by(email=email).first()
-    if volunteer and check_password_hash(volunteer.password_hash, password):
-        token = create_access_token(identity={'uid': volunteer.uid, 'role': 'volunteer'})
-        return jsonify({
-            'token': token,
-            'user': {
-                'uid': volunteer.uid,
-                'email': volunteer.email,
-                'role': 'volunteer'
+                'uid': account.uid,
+                'email': account.email,
+                'role': account.role
             }
         }), 200
     
     return jsonify({'message': 'Invalid email or password'}), 401
 
-@app.route('/api/auth/signup', methods=['POST'])
+# Add a route to handle OPTIONS requests explicitly
+@auth_bp.route('/api/auth/signup', methods=['POST', 'OPTIONS'])
 def signup():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
     data = request.get_json()
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'message': 'Missing email or password'}), 400
@@ -51,58 +62,91 @@ def signup():
     email = data.get('email')
     password = data.get('password')
     
-    # Check if user already exists
-    if Admin.query.filter_by(email=email).first() or Volunteer.query.filter_by(email=email).first():
-        return jsonify({'message': 'User already exists'}), 409
-    
-    # Create new volunteer
-    new_uid = str(uuid.uuid4())
-    volunteer = Volunteer(
-        uid=new_uid,
-        email=email,
-        name=data.get('name', email.split('@')[0])  # Default name to email username if not provided
-    )
-    volunteer.set_password(password)
-    
-    db.session.add(volunteer)
-    db.session.commit()
+    # Debug output
+    print(f"Signup attempt for email: {email}")
     
-    token = create_access_token(identity={'uid': volunteer.uid, 'role': 'volunteer'})
+    # Check if user already exists with more detailed error
+    existing_account = find_account(email)
+    if existing_account:
+        print(f"Email {email} already exists as {existing_account.role}")
+        return jsonify({'message': 'Email already registered', 'role': existing_account.role}), 409
     
-    return jsonify({
-        'message': 'User created successfully',
-        'token': token,
-        'user': {
-            'uid': volunteer.uid,
-            'email': volunteer.email,
-            'role': 'volunteer'
-        }
-    }), 201
+    try:
+        # Create new volunteer with a new UID
+        new_uid = str(uuid.uuid4())
+        volunteer = Volunteer(
+            uid=new_uid,
+            email=email,
+            name=data.get('name', email.split('@')[0]),
+            password_hash=hash_password(password),
+            createdAt=datetime.now(),
+            updatedAt=datetime.now(),
+            role='volunteer'
+        )
+        
+        db.session.add(volunteer)
+        db.session.commit()
+        
+        print(f"Successfully created volunteer with email: {email}, uid: {new_uid}")
+        
+        return jsonify({
+            'message': 'User created successfully',
+            **issue_tokens(new_uid, 'volunteer'),
+            'user': {
+                'uid': new_uid,
+                'email': email,
+                'role': 'volunteer'
+            }
+        }), 201
+        
+    except IntegrityError:
+        # Lost a race with another signup for the same email
+        db.session.rollback()
+        return jsonify({'message': 'Email already registered'}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating volunteer: {str(e)}")
+        return jsonify({'message': f'Error creating user: {str(e)}'}), 500
 
-@app.route('/api/auth/me', methods=['GET'])
+@auth_bp.route('/api/auth/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     current_user = get_jwt_identity()
     uid = current_user.get('uid')
     role = current_user.get('role')
     
-    if role == 'admin':
-        user = Admin.query.get(uid)
-    else:
-        user = Volunteer.query.get(uid)
-    
+    # Served from the identity cache on repeat navigations
+    user = get_principal(role, uid)
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
     return jsonify({
-        'uid': user.uid,
-        'email': user.email,
+        'uid': user['uid'],
+        'email': user['email'],
         'role': role
     }), 200
 
-@app.route('/api/auth/logout', methods=['POST'])
+@auth_bp.route('/api/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    # Rotation: the presented refresh token is spent and a new pair issued in
+    # the same family. No password check, so no hashing on this path.
+    claims = get_jwt()
+    identity = get_jwt_identity()
+    if not get_principal(identity.get('role'), identity.get('uid')):
+        return jsonify({'message': 'User not found'}), 401
+    
+    revoke_token(claims)
+    db.session.commit()
+    return jsonify(issue_tokens(identity.get('uid'), identity.get('role'), claims.get(FAMILY_CLAIM))), 200
+
+@auth_bp.route('/api/auth/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    # JWT tokens are stateless, so we don't actually invalidate them server-side
-    # The client will remove the token from storage
+    # The token and the refresh tokens of its login are denied server-side;
+    # the client still removes them from storage
+    claims = get_jwt()
+    revoke_token(claims)
+    revoke_family(claims)
+    db.session.commit()
     return jsonify({'message': 'Logged out successfully'}), 200
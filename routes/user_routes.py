@@ -1,27 +1,187 @@
-from flask import request, jsonify
+from flask import Blueprint, request, Response, stream_with_context, current_app
+from jsonio import jsonify, raw_json
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import app, db
-from models import User
+from extensions import db
+from models import User, Volunteer, ImportJob
+from pagination import page_size
+from export import export_stream, EXPORT_FORMATS
+from dates import parse_date, parse_datetime
+from bulk import bulk_create_users, bulk_update_users, bulk_delete_users, BULK_MAX_ITEMS
+import importer
+from search import search_users
+from phones import phone_key, suffix_range, SUFFIX_MIN_DIGITS
+from changelog import changes_since, parse_since, change_feed_supported
+from reads import paginate_rows
+from fieldsets import parse_fields, load_fields
+from conditional import conditional_json, collection_version, make_etag
+from occasions import upcoming_occasions, todays_digest, OCCASION_TYPES, MAX_WINDOW_DAYS
+from sqlalchemy import or_
+import re
+from sqlalchemy.exc import IntegrityError
 import uuid
+from datetime import datetime, date
 
-@app.route('/api/users', methods=['GET'])
+users_bp = Blueprint('users', __name__)
+
+# User routes
+@users_bp.route('/api/users', methods=['GET'])
 @jwt_required()
 def get_all_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    try:
+        fields = parse_fields(request.args.get('fields'), User)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def page():
+        items, next_cursor, prev_cursor = paginate_rows(
+            User,
+            ('createdAt', 'uid'),
+            fields,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit')
+        )
+        return {
+            'items': items,
+            'nextCursor': next_cursor,
+            'prevCursor': prev_cursor
+        }
+    
+    # No Last-Modified here: a delete does not move max(updatedAt)
+    latest, total = collection_version(User)
+    try:
+        return conditional_json(page, make_etag('users', latest, total))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@users_bp.route('/api/users/export', methods=['GET'])
+@jwt_required()
+def export_users():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'Unsupported export format'}), 400
+    
+    query = User.query.order_by(User.uid)
+    return Response(stream_with_context(export_stream(query, fmt)), mimetype=EXPORT_FORMATS[fmt])
+
+@users_bp.route('/api/users/changes', methods=['GET'])
+@jwt_required()
+def get_user_changes():
+    if not change_feed_supported():
+        return jsonify({'message': 'Change feed is not available on this database'}), 501
+    
+    try:
+        since = parse_since(request.args.get('since'))
+        limit = page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    changes, cursor, has_more = changes_since(since, limit)
+    return jsonify({'changes': changes, 'cursor': cursor, 'hasMore': has_more}), 200
+
+@users_bp.route('/api/users/search', methods=['GET'])
+@jwt_required()
+def search_all_users():
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'message': 'Search query is required'}), 400
+    
+    try:
+        limit = page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    users = search_users(query, limit)
+    return jsonify({'items': [user.to_dict() for user in users]}), 200
 
-@app.route('/api/users/<uid>', methods=['GET'])
+@users_bp.route('/api/lookup/phone', methods=['GET'])
+@jwt_required()
+def lookup_phone():
+    current_user = get_jwt_identity()
+    number = request.args.get('number', '')
+    match = request.args.get('match', 'exact')
+    digits = re.sub(r'\D', '', number)
+    
+    if match == 'exact':
+        key = phone_key(number)
+        if not key:
+            return jsonify({'message': 'Phone number is required'}), 400
+        def condition(model):
+            return or_(model.mobileKey == key, model.whatsappKey == key)
+    elif match == 'suffix':
+        if len(digits) < SUFFIX_MIN_DIGITS:
+            return jsonify({'message': f'At least {SUFFIX_MIN_DIGITS} digits are required'}), 400
+        low, high = suffix_range(digits)
+        def condition(model):
+            return or_(
+                (model.mobileKey >= low) & (model.mobileKey < high),
+                (model.whatsappKey >= low) & (model.whatsappKey < high)
+            )
+    else:
+        return jsonify({'message': 'match must be exact or suffix'}), 400
+    
+    try:
+        limit = page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    users = User.query.filter(condition(User)).limit(limit).all()
+    result = {'users': [user.to_dict() for user in users]}
+    # Volunteer records are only visible to admins
+    if current_user.get('role') == 'admin':
+        volunteers = Volunteer.query.filter(condition(Volunteer)).limit(limit).all()
+        result['volunteers'] = [volunteer.to_dict() for volunteer in volunteers]
+    
+    return jsonify(result), 200
+
+@users_bp.route('/api/occasions/upcoming', methods=['GET'])
+@jwt_required()
+def get_upcoming_occasions():
+    occasion_type = request.args.get('type', 'all')
+    if occasion_type != 'all' and occasion_type not in OCCASION_TYPES:
+        return jsonify({'message': 'type must be birthday, anniversary or all'}), 400
+    types = tuple(OCCASION_TYPES) if occasion_type == 'all' else (occasion_type,)
+    
+    try:
+        days = int(request.args.get('days', 7))
+        start = parse_date(request.args.get('from')) or date.today()
+    except ValueError:
+        return jsonify({'message': 'Invalid days or from date'}), 400
+    if not 1 <= days <= MAX_WINDOW_DAYS:
+        return jsonify({'message': f'days must be between 1 and {MAX_WINDOW_DAYS}'}), 400
+    
+    occasions = upcoming_occasions(start, days, types, request.args.get('maritalStatus'))
+    return jsonify({'from': start.isoformat(), 'days': days, 'items': occasions}), 200
+
+@users_bp.route('/api/occasions/today', methods=['GET'])
+@jwt_required()
+def get_todays_occasions():
+    return raw_json(todays_digest(), 200)
+
+@users_bp.route('/api/users/<uid>', methods=['GET'])
 @jwt_required()
 def get_user(uid):
-    user = User.query.get(uid)
+    try:
+        fields = parse_fields(request.args.get('fields'), User)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    user = load_fields(User.query, User, fields, 'updatedAt').get(uid)
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
-    return jsonify(user.to_dict()), 200
+    return conditional_json(lambda: user.to_dict(fields), make_etag('user', user.uid, user.updatedAt), user.updatedAt)
 
-@app.route('/api/users', methods=['POST'])
+# User CRUD routes
+def _default_creator(current_user):
+    # Recorded as createdBy/updatedBy when the request does not name one
+    if current_user.get('role') == 'admin':
+        return 'admin'
+    return current_user.get('email', 'volunteer')
+
+@users_bp.route('/api/users', methods=['POST'])
 @jwt_required()
 def create_user():
+    current_user = get_jwt_identity()
     data = request.get_json()
     
     if not data or not data.get('name'):
@@ -35,17 +195,28 @@ def create_user():
     if existing_user:
         return jsonify({'message': 'User with this ID already exists'}), 409
     
+    creator = data.get('createdBy', '') or _default_creator(current_user)
+    
+    try:
+        dob = parse_date(data.get('dob'))
+        anniversary_date = parse_date(data.get('anniversaryDate'))
+        created_at = parse_datetime(data.get('createdAt')) or datetime.now()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    
     new_user = User(
         uid=uid,
         name=data.get('name'),
-        dob=data.get('dob', ''),
+        dob=dob,
         mobile=data.get('mobile', ''),
         whatsapp=data.get('whatsapp', ''),
         address=data.get('address', ''),
         maritalStatus=data.get('maritalStatus', 'single'),
-        anniversaryDate=data.get('anniversaryDate', ''),
-        createdBy=data.get('createdBy', ''),
-        updatedBy=data.get('updatedBy', '')
+        anniversaryDate=anniversary_date,
+        createdAt=created_at,
+        updatedAt=datetime.now(),
+        createdBy=creator,
+        updatedBy=creator
     )
     
     db.session.add(new_user)
@@ -53,7 +224,7 @@ def create_user():
     
     return jsonify(new_user.to_dict()), 201
 
-@app.route('/api/users/<uid>', methods=['PUT'])
+@users_bp.route('/api/users/<uid>', methods=['PUT'])
 @jwt_required()
 def update_user(uid):
     user = User.query.get(uid)
@@ -65,8 +236,13 @@ def update_user(uid):
     # Update user fields
     if 'name' in data:
         user.name = data['name']
-    if 'dob' in data:
-        user.dob = data['dob']
+    try:
+        if 'dob' in data:
+            user.dob = parse_date(data['dob'])
+        if 'anniversaryDate' in data:
+            user.anniversaryDate = parse_date(data['anniversaryDate'])
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
     if 'mobile' in data:
         user.mobile = data['mobile']
     if 'whatsapp' in data:
@@ -75,10 +251,7 @@ def update_user(uid):
         user.address = data['address']
     if 'maritalStatus' in data:
         user.maritalStatus = data['maritalStatus']
-    if 'anniversaryDate' in data:
-        user.anniversaryDate = data['anniversaryDate']
-    if 'updatedAt' in data:
-        user.updatedAt = data['updatedAt']
+    user.updatedAt = datetime.now()
     if 'updatedBy' in data:
         user.updatedBy = data['updatedBy']
     
@@ -86,7 +259,7 @@ def update_user(uid):
     
     return jsonify(user.to_dict()), 200
 
-@app.route('/api/users/<uid>', methods=['DELETE'])
+@users_bp.route('/api/users/<uid>', methods=['DELETE'])
 @jwt_required()
 def delete_user(uid):
     user = User.query.get(uid)
@@ -97,3 +270,95 @@ def delete_user(uid):
     db.session.commit()
     
     return jsonify({'message': 'User deleted successfully'}), 200
+
+# Bulk user routes - each request is a single transaction with per-item results
+def _bulk_items(key):
+    data = request.get_json()
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'message': f'Expected a non-empty array of {key}'}), 400)
+    if len(items) > current_app.config.get('BULK_MAX_ITEMS', BULK_MAX_ITEMS):
+        return None, (jsonify({'message': 'Too many items in one request'}), 413)
+    return items, None
+
+def _bulk_response(results):
+    failed = sum(1 for result in results if result['status'] == 'error')
+    return jsonify({
+        'results': results,
+        'succeeded': len(results) - failed,
+        'failed': failed
+    }), 200
+
+@users_bp.route('/api/users/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create():
+    current_user = get_jwt_identity()
+    items, error = _bulk_items('users')
+    if error:
+        return error
+    
+    try:
+        results = bulk_create_users(items, _default_creator(current_user))
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Batch conflicts with existing users'}), 409
+    return _bulk_response(results)
+
+@users_bp.route('/api/users/bulk', methods=['PUT'])
+@jwt_required()
+def bulk_update():
+    items, error = _bulk_items('users')
+    if error:
+        return error
+    
+    results = bulk_update_users(items)
+    return _bulk_response(results)
+
+@users_bp.route('/api/users/bulk', methods=['DELETE'])
+@jwt_required()
+def bulk_delete():
+    uids, error = _bulk_items('uids')
+    if error:
+        return error
+    
+    results = bulk_delete_users(uids)
+    return _bulk_response(results)
+
+# Spreadsheet import routes
+@users_bp.route('/api/imports', methods=['POST'])
+@jwt_required()
+def create_import():
+    current_user = get_jwt_identity()
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'message': 'A CSV or XLSX file is required'}), 400
+    
+    fmt = importer.import_format(upload.filename)
+    if not fmt:
+        return jsonify({'message': 'Only .csv and .xlsx files can be imported'}), 400
+    if fmt == 'xlsx' and not importer.xlsx_supported():
+        return jsonify({'message': 'XLSX imports require the openpyxl package'}), 400
+    
+    creator = _default_creator(current_user)
+    job = importer.start_import(current_app._get_current_object(), upload, fmt, creator)
+    return jsonify(job.to_dict()), 202
+
+@users_bp.route('/api/imports/<job_id>', methods=['GET'])
+@jwt_required()
+def get_import(job_id):
+    job = ImportJob.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Import not found'}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+@users_bp.route('/api/imports/<job_id>/errors', methods=['GET'])
+@jwt_required()
+def get_import_errors(job_id):
+    job = ImportJob.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Import not found'}), 404
+    
+    response = Response(stream_with_context(importer.error_report(job_id)), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=import-{job_id}-errors.csv'
+    return response
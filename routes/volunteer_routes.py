@@ -1,10 +1,25 @@
-from flask import request, jsonify
+from flask import Blueprint, request, Response, stream_with_context
+from jsonio import jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import app, db
+from extensions import db
 from models import Volunteer
+from export import export_stream, EXPORT_FORMATS
+from dates import parse_date, parse_datetime
+from accounts import find_account
+from identity import invalidate_principal
+from revocation import revoke_principal
+from passwords import hash_password
+from reads import paginate_rows
+from fieldsets import parse_fields, load_fields
+from conditional import conditional_json, collection_version, make_etag
+from sqlalchemy.exc import IntegrityError
 import uuid
+from datetime import datetime
 
-@app.route('/api/volunteers', methods=['GET'])
+volunteers_bp = Blueprint('volunteers', __name__)
+
+# Add more routes for Volunteer API
+@volunteers_bp.route('/api/volunteers', methods=['GET'])
 @jwt_required()
 def get_all_volunteers():
     # Check if user is admin
@@ -12,10 +27,47 @@ def get_all_volunteers():
     if current_user.get('role') != 'admin':
         return jsonify({'message': 'Unauthorized'}), 403
     
-    volunteers = Volunteer.query.all()
-    return jsonify([volunteer.to_dict() for volunteer in volunteers]), 200
+    try:
+        fields = parse_fields(request.args.get('fields'), Volunteer)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def page():
+        items, next_cursor, prev_cursor = paginate_rows(
+            Volunteer,
+            ('createdAt', 'uid'),
+            fields,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit')
+        )
+        return {
+            'items': items,
+            'nextCursor': next_cursor,
+            'prevCursor': prev_cursor
+        }
+    
+    latest, total = collection_version(Volunteer)
+    try:
+        return conditional_json(page, make_etag('volunteers', latest, total))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@volunteers_bp.route('/api/volunteers/export', methods=['GET'])
+@jwt_required()
+def export_volunteers():
+    # Check if user is admin
+    current_user = get_jwt_identity()
+    if current_user.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'Unsupported export format'}), 400
+    
+    query = Volunteer.query.order_by(Volunteer.uid)
+    return Response(stream_with_context(export_stream(query, fmt)), mimetype=EXPORT_FORMATS[fmt])
 
-@app.route('/api/volunteers/<uid>', methods=['GET'])
+@volunteers_bp.route('/api/volunteers/<uid>', methods=['GET'])
 @jwt_required()
 def get_volunteer(uid):
     current_user = get_jwt_identity()
@@ -24,13 +76,18 @@ def get_volunteer(uid):
     if current_user.get('role') != 'admin' and current_user.get('uid') != uid:
         return jsonify({'message': 'Unauthorized'}), 403
     
-    volunteer = Volunteer.query.get(uid)
+    try:
+        fields = parse_fields(request.args.get('fields'), Volunteer)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    volunteer = load_fields(Volunteer.query, Volunteer, fields, 'updatedAt').get(uid)
     if not volunteer:
         return jsonify({'message': 'Volunteer not found'}), 404
     
-    return jsonify(volunteer.to_dict()), 200
+    return conditional_json(lambda: volunteer.to_dict(fields), make_etag('volunteer', volunteer.uid, volunteer.updatedAt), volunteer.updatedAt)
 
-@app.route('/api/volunteers', methods=['POST'])
+@volunteers_bp.route('/api/volunteers', methods=['POST'])
 @jwt_required()
 def create_volunteer():
     current_user = get_jwt_identity()
@@ -44,42 +101,49 @@ def create_volunteer():
     if not data or not data.get('name') or not data.get('email'):
         return jsonify({'message': 'Name and email are required'}), 400
     
-    # Check if email is already in use
-    if Volunteer.query.filter_by(email=data.get('email')).first():
+    # Check if email is already in use by an admin or volunteer
+    if find_account(data.get('email')):
         return jsonify({'message': 'Email already in use'}), 409
     
     # Generate new UID if not provided
     uid = data.get('uid', str(uuid.uuid4()))
     
-    # Create password hash if password is provided
-    password_hash = None
-    if data.get('password'):
-        from werkzeug.security import generate_password_hash
-        password_hash = generate_password_hash(data.get('password'))
+    try:
+        dob = parse_date(data.get('dob'))
+        anniversary_date = parse_date(data.get('anniversaryDate'))
+        created_at = parse_datetime(data.get('createdAt')) or datetime.now()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
     
     new_volunteer = Volunteer(
         uid=uid,
         name=data.get('name'),
         email=data.get('email'),
-        password_hash=password_hash,
-        dob=data.get('dob', ''),
+        dob=dob,
         mobile=data.get('mobile', ''),
         whatsapp=data.get('whatsapp', ''),
         address=data.get('address', ''),
         maritalStatus=data.get('maritalStatus', 'single'),
-        anniversaryDate=data.get('anniversaryDate', ''),
-        createdAt=data.get('createdAt', ''),
-        updatedAt=data.get('updatedAt', ''),
+        anniversaryDate=anniversary_date,
+        createdAt=created_at,
+        updatedAt=datetime.now(),
         createdBy=data.get('createdBy', 'admin'),
         role='volunteer'
     )
     
+    if data.get('password'):
+        new_volunteer.password_hash = hash_password(data.get('password'))
+    
     db.session.add(new_volunteer)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Email already in use'}), 409
     
     return jsonify(new_volunteer.to_dict()), 201
 
-@app.route('/api/volunteers/<uid>', methods=['PUT'])
+@volunteers_bp.route('/api/volunteers/<uid>', methods=['PUT'])
 @jwt_required()
 def update_volunteer(uid):
     current_user = get_jwt_identity()
@@ -99,8 +163,13 @@ def update_volunteer(uid):
         volunteer.name = data['name']
     if 'email' in data and current_user.get('role') == 'admin':  # Only admin can change email
         volunteer.email = data['email']
-    if 'dob' in data:
-        volunteer.dob = data['dob']
+    try:
+        if 'dob' in data:
+            volunteer.dob = parse_date(data['dob'])
+        if 'anniversaryDate' in data:
+            volunteer.anniversaryDate = parse_date(data['anniversaryDate'])
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
     if 'mobile' in data:
         volunteer.mobile = data['mobile']
     if 'whatsapp' in data:
@@ -109,20 +178,22 @@ def update_volunteer(uid):
         volunteer.address = data['address']
     if 'maritalStatus' in data:
         volunteer.maritalStatus = data['maritalStatus']
-    if 'anniversaryDate' in data:
-        volunteer.anniversaryDate = data['anniversaryDate']
-    if 'updatedAt' in data:
-        volunteer.updatedAt = data['updatedAt']
+    volunteer.updatedAt = datetime.now()
     
     # Update password if provided
     if 'password' in data and data['password']:
-        volunteer.set_password(data['password'])
+        volunteer.password_hash = hash_password(data['password'])
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Email already in use'}), 409
+    invalidate_principal('volunteer', uid)
     
     return jsonify(volunteer.to_dict()), 200
 
-@app.route('/api/volunteers/<uid>', methods=['DELETE'])
+@volunteers_bp.route('/api/volunteers/<uid>', methods=['DELETE'])
 @jwt_required()
 def delete_volunteer(uid):
     current_user = get_jwt_identity()
@@ -136,6 +207,9 @@ def delete_volunteer(uid):
         return jsonify({'message': 'Volunteer not found'}), 404
     
     db.session.delete(volunteer)
+    # Tokens already issued to the volunteer stop working with the delete
+    revoke_principal(uid)
     db.session.commit()
+    invalidate_principal('volunteer', uid)
     
     return jsonify({'message': 'Volunteer deleted successfully'}), 200
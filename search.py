@@ -0,0 +1,102 @@
+import re
+from sqlalchemy import DDL, event, text, and_, or_
+from extensions import db
+from models import User
+
+SEARCH_COLUMNS = ('name', 'address', 'mobile', 'whatsapp')
+# bm25 weights, in SEARCH_COLUMNS order: a name hit ranks above an address hit
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join('new.' + column for column in SEARCH_COLUMNS)
+_user_values = ', '.join('users.' + column for column in SEARCH_COLUMNS)
+_old_docid = "(SELECT docid FROM users_fts_docs WHERE uid = old.uid)"
+
+# users has a TEXT primary key, so its implicit rowid is not stable (VACUUM
+# may renumber it) and cannot key the index. Each user instead gets a docid
+# from users_fts_docs, whose INTEGER PRIMARY KEY never changes, and the FTS5
+# table stores its own copy of the searched columns plus the uid to join on.
+# Triggers keep both in sync on every write path (ORM, bulk executemany,
+# imports).
+SEARCH_DDL = [
+    "DROP TRIGGER IF EXISTS users_fts_ai",
+    "DROP TRIGGER IF EXISTS users_fts_ad",
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TABLE IF EXISTS users_fts",
+    "DROP TABLE IF EXISTS users_fts_docs",
+    "CREATE TABLE users_fts_docs (docid INTEGER PRIMARY KEY, uid TEXT NOT NULL UNIQUE)",
+    f"CREATE VIRTUAL TABLE users_fts USING fts5(uid UNINDEXED, {_columns}, prefix='2 3')",
+    f"CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+    f"INSERT INTO users_fts_docs(uid) VALUES (new.uid); "
+    f"INSERT INTO users_fts(rowid, uid, {_columns}) VALUES (last_insert_rowid(), new.uid, {_new_values}); END",
+    f"CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+    f"DELETE FROM users_fts WHERE rowid = {_old_docid}; "
+    f"DELETE FROM users_fts_docs WHERE uid = old.uid; END",
+    f"CREATE TRIGGER users_fts_au AFTER UPDATE ON users BEGIN "
+    f"DELETE FROM users_fts WHERE rowid = {_old_docid}; "
+    f"UPDATE users_fts_docs SET uid = new.uid WHERE uid = old.uid; "
+    f"INSERT INTO users_fts(rowid, uid, {_columns}) "
+    f"SELECT docid, new.uid, {_new_values} FROM users_fts_docs WHERE uid = new.uid; END"
+]
+
+# Fills the index from users; run after SEARCH_DDL on a database with rows
+SEARCH_FILL = [
+    "INSERT INTO users_fts_docs(uid) SELECT uid FROM users",
+    f"INSERT INTO users_fts(rowid, uid, {_columns}) SELECT users_fts_docs.docid, users.uid, {_user_values} "
+    "FROM users JOIN users_fts_docs ON users_fts_docs.uid = users.uid"
+]
+
+# Fresh SQLite databases get the index from db.create_all(); a recreated
+# users table starts a new, empty one
+for _statement in SEARCH_DDL:
+    event.listen(User.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+_fts_available = {}
+
+
+def ensure_search_index():
+    # (Re)creates the index and triggers on an existing database and fills it
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.begin() as conn:
+        for statement in SEARCH_DDL + SEARCH_FILL:
+            conn.exec_driver_sql(statement)
+    _fts_available.pop(str(db.engine.url), None)
+    return True
+
+
+def fts_available():
+    key = str(db.engine.url)
+    if key not in _fts_available:
+        _fts_available[key] = db.engine.dialect.name == 'sqlite' and db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+        ).first() is not None
+    return _fts_available[key]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def search_users(query, limit):
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if fts_available():
+        # Every term must match, each as a prefix: "rama kri" finds "Rama Krishna"
+        match = ' '.join('"%s"*' % term for term in terms)
+        # bm25 weights are positional over the FTS columns; uid comes first
+        # and never matches, so it weighs nothing
+        weights = ', '.join(str(weight) for weight in (0.0,) + SEARCH_WEIGHTS)
+        statement = text(
+            "SELECT users.* FROM users_fts JOIN users ON users.uid = users_fts.uid "
+            f"WHERE users_fts MATCH :match ORDER BY bm25(users_fts, {weights}) LIMIT :limit"
+        )
+        return User.query.from_statement(statement).params(match=match, limit=limit).all()
+
+    # Other engines: substring match on every term, unranked
+    conditions = []
+    for term in terms:
+        pattern = '%' + term + '%'
+        conditions.append(or_(*[getattr(User, column).ilike(pattern) for column in SEARCH_COLUMNS]))
+    return User.query.filter(and_(*conditions)).order_by(User.name).limit(limit).all()
@@ -0,0 +1,32 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Keeps each IN (...) list under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+# INSERT constructs that support on_conflict_do_update, by dialect name
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+
+def chunks(values, size=IN_CHUNK_SIZE):
+    # Consecutive slices of a list, e.g. for one IN (...) query each
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def upsert(connection, table, values, keys, update):
+    """INSERT ``values``, or on a conflict over ``keys`` apply ``update``.
+
+    ``update(excluded)`` returns the SET clause, where ``excluded`` holds the
+    row that failed to insert. One statement, so concurrent first writes of a
+    key cannot race each other into an IntegrityError.
+    """
+    name = connection.dialect.name
+    if name not in UPSERT_INSERTS:
+        raise RuntimeError(f'Upserts are not supported on {name}')
+    statement = UPSERT_INSERTS[name](table).values(**values)
+    return connection.execute(statement.on_conflict_do_update(
+        index_elements=keys, set_=update(statement.excluded)
+    ))
@@ -0,0 +1,164 @@
+from extensions import db
+from models import User, Volunteer, StatsRollup
+from sqlalchemy import event, func, inspect, and_, or_
+from sqlalchemy.orm import Session
+from collections import Counter
+from sqlutil import upsert
+from datetime import datetime, timedelta
+
+# Per model: the rollup prefix and the timestamp bucketed into a daily counter.
+# volunteers.created[day] feeds newThisMonth, users.updated[day] feeds activeUsers.
+ROLLUP_SOURCES = {
+    User: ('users', 'updatedAt', 'users.updated'),
+    Volunteer: ('volunteers', 'createdAt', 'volunteers.created')
+}
+
+
+def month_bounds(now):
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def compute_dashboard_stats(now=None):
+    now = now or datetime.now()
+    month_start, month_end = month_bounds(now)
+    thirty_days_ago = now - timedelta(days=30)
+
+    total_volunteers = db.session.query(func.count(Volunteer.uid)).scalar()
+    total_users = db.session.query(func.count(User.uid)).scalar()
+    new_this_month = db.session.query(func.count(Volunteer.uid)).filter(
+        Volunteer.createdAt >= month_start,
+        Volunteer.createdAt < month_end
+    ).scalar()
+    active_users = db.session.query(func.count(User.uid)).filter(
+        User.updatedAt > thirty_days_ago
+    ).scalar()
+
+    return {
+        'totalVolunteers': total_volunteers,
+        'totalUsers': total_users,
+        'newThisMonth': new_this_month,
+        'activeUsers': active_users
+    }
+
+
+def read_dashboard_stats(now=None):
+    # Reads at most ~60 rollup rows regardless of table sizes. The time windows
+    # are resolved to whole days.
+    now = now or datetime.now()
+    month_start, month_end = month_bounds(now)
+    cutoff = _day(now - timedelta(days=30))
+
+    rows = StatsRollup.query.filter(or_(
+        and_(StatsRollup.metric.in_(['users.total', 'volunteers.total']), StatsRollup.bucket == ''),
+        and_(StatsRollup.metric == 'volunteers.created',
+             StatsRollup.bucket >= _day(month_start), StatsRollup.bucket < _day(month_end)),
+        and_(StatsRollup.metric == 'users.updated', StatsRollup.bucket > cutoff)
+    )).all()
+
+    totals = Counter()
+    for row in rows:
+        totals[row.metric] += row.value
+
+    return {
+        'totalVolunteers': totals['volunteers.total'],
+        'totalUsers': totals['users.total'],
+        'newThisMonth': totals['volunteers.created'],
+        'activeUsers': totals['users.updated']
+    }
+
+
+def _day(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return value.strftime('%Y-%m-%d')
+
+
+def apply_rollup_deltas(connection, deltas):
+    table = StatsRollup.__table__
+    for (metric, bucket), delta in deltas.items():
+        if not delta:
+            continue
+        upsert(
+            connection, table, {'metric': metric, 'bucket': bucket, 'value': delta}, ['metric', 'bucket'],
+            lambda excluded: {'value': table.c.value + excluded.value}
+        )
+
+
+def rollup_deltas(model, created=(), deleted=(), moved=()):
+    """Counter deltas for rows of ``model``.
+
+    ``created``/``deleted`` are the timestamps of inserted/removed rows,
+    ``moved`` holds ``(old, new)`` pairs for rows whose timestamp changed.
+    """
+    prefix, _, metric = ROLLUP_SOURCES[model]
+    deltas = Counter()
+    deltas[(prefix + '.total', '')] += len(created) - len(deleted)
+    for value in created:
+        if _day(value):
+            deltas[(metric, _day(value))] += 1
+    for value in deleted:
+        if _day(value):
+            deltas[(metric, _day(value))] -= 1
+    for old, new in moved:
+        if _day(old) != _day(new):
+            if _day(old):
+                deltas[(metric, _day(old))] -= 1
+            if _day(new):
+                deltas[(metric, _day(new))] += 1
+    return deltas
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_rollup_history(session, flush_context, instances):
+    # Make sure the pre-update timestamp is known before the UPDATE is emitted
+    for obj in session.dirty:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source:
+            inspect(obj).attrs[source[1]].load_history()
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_rollups(session, flush_context):
+    # Runs inside the flush, so the counters commit or roll back with the rows
+    deltas = Counter()
+    for model, (_, attr, _) in ROLLUP_SOURCES.items():
+        created = [getattr(obj, attr) for obj in session.new if isinstance(obj, model)]
+        deleted = [getattr(obj, attr) for obj in session.deleted if isinstance(obj, model)]
+        moved = []
+        for obj in session.dirty:
+            if isinstance(obj, model):
+                history = inspect(obj).attrs[attr].history
+                if history.deleted or history.added:
+                    old = history.deleted[0] if history.deleted else None
+                    new = history.added[0] if history.added else None
+                    moved.append((old, new))
+        if created or deleted or moved:
+            deltas.update(rollup_deltas(model, created, deleted, moved))
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
+
+
+def rebuild_rollups():
+    # Recompute every counter from the base tables, e.g. after a bulk import
+    deltas = Counter()
+    for model, (prefix, attr, metric) in ROLLUP_SOURCES.items():
+        column = getattr(model, attr)
+        deltas[(prefix + '.total', '')] = db.session.query(func.count(model.uid)).scalar()
+        day = func.date(column)
+        for bucket, count in db.session.query(day, func.count(model.uid)).filter(column.isnot(None)).group_by(day):
+            if bucket:
+                deltas[(metric, _day(bucket))] = count
+
+    StatsRollup.query.delete()
+    db.session.bulk_insert_mappings(StatsRollup, [
+        {'metric': metric, 'bucket': bucket, 'value': value}
+        for (metric, bucket), value in deltas.items()
+    ])
+    db.session.commit()
@@ -0,0 +1,29 @@
+import sqlite3
+from app_init import create_app
+from extensions import db
+from replicas import REPLICA_BIND, replica_configured
+
+def sync_replica():
+    # Stand-in for real replication when primary and replica are two local
+    # SQLite files: copy the primary over the replica with the backup API
+    app = create_app()
+    with app.app_context():
+        if not replica_configured(app):
+            print("No replica configured; set REPLICA_DATABASE_URL.")
+            return
+        primary = db.engine.url
+        replica = db.get_engine(app, bind=REPLICA_BIND).url
+        if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite':
+            print("Only SQLite primaries and replicas can be synced with this script.")
+            return
+        source = sqlite3.connect(primary.database)
+        target = sqlite3.connect(replica.database)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        print(f"Replica {replica.database} synced from {primary.database}.")
+
+if __name__ == '__main__':
+    sync_replica()
@@ -0,0 +1,66 @@
+import uuid
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from jwt.exceptions import InvalidTokenError
+from extensions import jwt
+
+# Claim shared by every token descended from one login; rotation keeps it,
+# and revoking it ends the whole chain
+FAMILY_CLAIM = 'family'
+
+
+def _key_ring():
+    # JWT_SIGNING_KEYS maps key ids to secrets; without one, tokens are
+    # signed with JWT_SECRET_KEY and carry no kid, as before
+    return current_app.config.get('JWT_SIGNING_KEYS') or {}
+
+
+def signing_key_id():
+    ring = _key_ring()
+    if not ring:
+        return None
+    kid = current_app.config.get('JWT_SIGNING_KEY_ID') or next(iter(ring))
+    if kid not in ring:
+        raise RuntimeError(f'JWT signing key {kid!r} is not in JWT_SIGNING_KEYS')
+    return kid
+
+
+def _encode_key(identity):
+    kid = signing_key_id()
+    return _key_ring()[kid] if kid else current_app.config['JWT_SECRET_KEY']
+
+
+def _headers(identity):
+    kid = signing_key_id()
+    return {'kid': kid} if kid else {}
+
+
+def _decode_key(jwt_header, jwt_payload):
+    # Any key still in the ring verifies, so a rotated-out signer's tokens
+    # stay valid until its entry is removed
+    kid = jwt_header.get('kid')
+    if kid is None:
+        return current_app.config['JWT_SECRET_KEY']
+    if kid not in _key_ring():
+        raise InvalidTokenError('Unknown signing key')
+    return _key_ring()[kid]
+
+
+def issue_tokens(uid, role, family=None):
+    """A short-lived access token and a refresh token for the principal.
+
+    ``family`` continues an existing login on rotation; a new login starts
+    a new one.
+    """
+    identity = {'uid': uid, 'role': role}
+    claims = {FAMILY_CLAIM: family or str(uuid.uuid4())}
+    return {
+        'token': create_access_token(identity=identity, additional_claims=claims),
+        'refreshToken': create_refresh_token(identity=identity, additional_claims=claims)
+    }
+
+
+def init_app(app):
+    jwt.encode_key_loader(_encode_key)
+    jwt.decode_key_loader(_decode_key)
+    jwt.additional_headers_loader(_headers)